@@ -1,10 +1,12 @@
 __all__ = ['save', 'load', 'expandFolders', 'mkdir_p',
-           'getExtension', 'checkExtension', 'changeExtension',
+           'getExtension', 'checkExtension', 'checkExtension_many', 'changeExtension',
            'ensureExtension', 'appendToFileName', 'prependToFileName',
            'prependAppendToFileName', 'findFile',
-           'getMD5','checkFile', 'WriteMethod', 'cat_files_py',
-           'getFiles', 'expandPath', 'BadFilePath',
-           'LockFile']
+           'getMD5', 'getHashes', 'hash_many', 'checkFile', 'WriteMethod', 'cat_files_py',
+           'getFiles', 'expandPath', 'expandPath_many', 'BadFilePath',
+           'LockFile', 'LockTimeout', 'saveTar', 'createTarIndex', 'load_many',
+           'CompressionCodec', 'registerCodec', 'getCodec', 'LazyNpzFile',
+           'ListingCache']
 
 import numpy as np
 import cPickle
@@ -15,67 +17,391 @@ import os
 import sys
 import shutil
 import StringIO
-import signal
+import errno
+import socket
 from time import sleep, time
 
 class BadFilePath(ValueError): pass
 
 from RingerCore.Logger import Logger
+from RingerCore.util import lru_cache
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+# flock errors meaning that the file system does not support it
+_flockUnsupported = ( errno.ENOLCK, errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL )
+
+class LockTimeout( IOError ): pass
+
 class LockFile( Logger ):
   """
-  Simple lock file
+  Advisory lock file.
+
+  The lock is held with fcntl.flock, thus it is released by the operating
+  system if the process holding it dies. When the file system does not
+  support flock, the lock file is created exclusively holding the host and
+  PID of its owner, and it is removed as stale when the owner is no longer
+  running on this host.
+
+  -> path: the lock file path;
+  -> shared: take a shared lock, which can be held by several readers at the
+  same time, instead of an exclusive one;
+  -> timeout: maximum time (in seconds) waiting for the lock. LockTimeout is
+  raised when it is exceeded. By default, it is raised at once when the lock
+  is held by another process. Wait forever when set to None;
+  -> backoff: the (first, maximum) time (in seconds) slept between attempts.
+  The sleep time doubles after each failed attempt.
   """
 
-  def __init__( self, path ):
+  _fd = None
+  _pidLock = False
+  path = None
+
+  def __init__( self, path, shared = False, timeout = 0, backoff = (0.005, 0.5), logger = None ):
+    Logger.__init__( self, logger = logger )
+    self.shared = shared
+    delay, maxDelay = backoff
+    start = time()
+    warned = False
+    while not self.__acquire( path ):
+      elapsed = time() - start
+      if not timeout and timeout is not None:
+        raise LockTimeout( errno.EAGAIN, "Lock file is held by another process", path )
+      if timeout is not None and elapsed >= timeout:
+        raise LockTimeout( errno.ETIMEDOUT, "Timed out after %.1fs waiting for lock file" % elapsed, path )
+      if not warned and elapsed > 1.:
+        self._warning("Waiting other process to unlock file %s...", path )
+        warned = True
+      sleep( delay if timeout is None else min( delay, timeout - elapsed ) )
+      delay = min( 2 * delay, maxDelay )
     self.path = path
-    if self.exists():
-      self.path = None
-      raise IOError( "Cannot create .lock file, file %s already exists." % self.path, self.path )
-    open( self.path, 'w' ).close()
-    self._prevSignal = signal.getsignal(signal.SIGTERM)
-    signal.signal( signal.SIGTERM, self._abort )
 
   def exists( self ):
     return os.path.isfile( self.path )
 
-  def _abort( self, signum, frame ):
-    self.delete()
-    if self._prevSignal: self._prevSignal(signum, frame )
-
   def delete( self ):
-    if self.exists(): os.remove( self.path )
+    """
+    Release the lock. The lock file is removed unless other processes are
+    still holding a shared lock on it.
+    """
+    fd, self._fd = self._fd, None
+    if fd is None: return
+    try:
+      if not self._pidLock:
+        if self.shared:
+          try:
+            fcntl.flock( fd, fcntl.LOCK_EX | fcntl.LOCK_NB )
+          except IOError:
+            # Other readers are still using it
+            return
+        if not self.__sameFile( fd, self.path ):
+          return
+      os.remove( self.path )
+    except OSError:
+      pass
+    finally:
+      os.close( fd )
+
+  release = delete
+
+  def __enter__( self ):
+    return self
+
+  def __exit__( self, *args ):
+    self.delete()
 
   def __del__( self ):
     self.delete()
 
-def expandPath(path):
-  " Returns absolutePath path expanding variables and user symbols "
+  def __acquire( self, path ):
+    if fcntl is not None and not self._pidLock:
+      fd = os.open( path, os.O_RDWR | os.O_CREAT, 0666 )
+      try:
+        fcntl.flock( fd, ( fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX ) | fcntl.LOCK_NB )
+      except IOError, e:
+        os.close( fd )
+        if e.errno in ( errno.EAGAIN, errno.EACCES ):
+          return False
+        if e.errno not in _flockUnsupported:
+          raise
+        self._debug("File system does not support flock, using PID lock file %s instead.", path )
+        self._pidLock = True
+      else:
+        if not self.__sameFile( fd, path ):
+          # The previous owner removed the file after we opened it
+          os.close( fd )
+          return self.__acquire( path )
+        if not self.shared:
+          os.ftruncate( fd, 0 )
+          os.write( fd, self.__owner() )
+        self._fd = fd
+        return True
+    try:
+      fd = os.open( path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0666 )
+    except OSError, e:
+      if e.errno != errno.EEXIST:
+        raise
+      if self.__isStale( path ):
+        self._warning("Removing stale lock file %s.", path )
+        try:
+          os.remove( path )
+        except OSError:
+          pass
+      return False
+    os.write( fd, self.__owner() )
+    self._fd = fd
+    return True
+
+  def __owner( self ):
+    return '%s:%d\n' % ( socket.gethostname(), os.getpid() )
+
+  def __isStale( self, path ):
+    """
+    Whether PID lock file path belongs to a process which is no longer
+    running on this host.
+    """
+    try:
+      with open( path ) as f:
+        host, pid = f.read().strip().rsplit( ':', 1 )
+      pid = int( pid )
+    except (IOError, ValueError):
+      return False
+    if host != socket.gethostname():
+      return False
+    try:
+      os.kill( pid, 0 )
+    except OSError, e:
+      return e.errno == errno.ESRCH
+    return False
+
+  def __sameFile( self, fd, path ):
+    try:
+      st = os.stat( path )
+    except OSError:
+      return False
+    fst = os.fstat( fd )
+    return ( st.st_dev, st.st_ino ) == ( fst.st_dev, fst.st_ino )
+
+def expandPath(path, useCache = False):
+  """
+  Returns absolutePath path expanding variables and user symbols.
+
+  When useCache is set, the results are cached for the expanded path (and the
+  working directory, when it is relative), so changes on the environment
+  variables are taken into account. The symbolic link resolution is cached as
+  well, thus only use it when the paths are not symbolic links which may be
+  created, removed or changed (by any process) while the cache is in use.
+  """
   if not isinstance( path, basestring):
     raise BadFilePath(path)
+  expanded = os.path.expanduser( os.path.expandvars( path ) )
+  if not useCache:
+    return __resolve_path( path, expanded )
+  return __cached_resolve_path( path, expanded, None if os.path.isabs( expanded ) else os.getcwd() )
+
+def expandPath_many(paths, useCache = False):
+  """
+  Returns expandPath for each one of the paths.
+  """
+  if not isinstance( paths, (list, tuple) ):
+    paths = list( paths )
+  # A list larger than the cache would only replace all its entries
+  useCache = useCache and len( paths ) <= _expandPathCacheSize
+  cwd = os.getcwd()
+  isabs, expanduser, expandvars = os.path.isabs, os.path.expanduser, os.path.expandvars
+  ret = []
+  for path in paths:
+    if not isinstance( path, basestring):
+      raise BadFilePath(path)
+    expanded = expanduser( expandvars( path ) )
+    if useCache:
+      ret.append( __cached_resolve_path( path, expanded, None if isabs( expanded ) else cwd ) )
+    else:
+      ret.append( __resolve_path( path, expanded ) )
+  return ret
+
+def __resolve_path( path, expanded ):
   try:
-    return os.path.abspath( os.path.join(os.path.dirname(path), os.readlink( os.path.expanduser( os.path.expandvars( path ) ) ) ) )
+    return os.path.abspath( os.path.join(os.path.dirname(path), os.readlink( expanded ) ) )
   except OSError:
-    return os.path.abspath( os.path.expanduser( os.path.expandvars( path ) ) )
-
-def watchLock(filename):
-  logger = Logger.getModuleLogger( "watchLock" )
-  lockFileName = os.path.join( os.path.join( os.path.dirname(filename), '.' + os.path.basename(filename) + '.lock' ) )
-  firstMsg = True
-  while os.path.exists( lockFileName ):
-    if firstMsg:
-      logger.warning("Waiting other process to unlock file %s...", lockFileName )
-      firstMsg = False
-    sleep(1)
-  lockFile = LockFile( lockFileName )
-  return lockFile
+    return os.path.abspath( expanded )
+
+_expandPathCacheSize = 16384
+
+@lru_cache(maxsize = _expandPathCacheSize)
+def __cached_resolve_path( path, expanded, cwd ):
+  return __resolve_path( path, expanded )
+
+def watchLock(filename, shared = False, timeout = None, logger = None):
+  """
+  Lock filename using its lock file (.<basename>.lock at the same directory),
+  waiting for other processes holding it. See LockFile.
+  """
+  lockFileName = os.path.join( os.path.dirname(filename), '.' + os.path.basename(filename) + '.lock' )
+  return LockFile( lockFileName, shared = shared, timeout = timeout, logger = logger )
+
+class CompressionCodec( object ):
+  """
+  Compression codec used by save and load to write/read pickled files.
+
+  -> name: the codec name, used as the compress argument on save and as the
+  decompress argument on load;
+  -> extensions: the file extensions used by the codec. The first one is used
+  when saving files;
+  -> magic: the bytes which every file compressed by this codec starts with;
+  -> opener: a function opener(filename, mode, level) returning a file object.
+  The level is None when the codec default level should be used.
+  """
+
+  def __init__(self, name, extensions, magic, opener):
+    self.name = name
+    self.extensions = tuple(extensions)
+    self.magic = magic
+    self._opener = opener
+
+  def open(self, filename, mode, level = None):
+    try:
+      return self._opener( filename, mode, level )
+    except ImportError, e:
+      raise ImportError( "Compression codec '%s' is not available. Reason: %s" % (self.name, e) )
+
+  def __repr__(self):
+    return '%s(%s)' % (self.__class__.__name__, self.name)
+
+from collections import OrderedDict
+_codecs = OrderedDict()
+
+def registerCodec( codec ):
+  """
+  Make CompressionCodec codec available to save and load.
+  """
+  if not isinstance( codec, CompressionCodec ):
+    raise TypeError("codec must be a CompressionCodec instance.")
+  _codecs[codec.name] = codec
+
+def getCodec( name ):
+  """
+  Returns the registered codec for name
+  """
+  try:
+    return _codecs[name]
+  except KeyError:
+    raise ValueError("Unknown compression codec '%s'. Available codecs are: %r" % (name, _codecs.keys()))
+
+def _codecFromFileName( filename ):
+  """
+  Returns the codec matching filename extension, None if there is no match.
+  """
+  for codec in _codecs.itervalues():
+    if checkExtension( filename, codec.extensions ):
+      return codec
+  return None
+
+def _codecFromMagic( filename ):
+  """
+  Returns the codec matching the first bytes in filename, None if there is no match.
+  """
+  with open(filename, 'rb') as f:
+    header = f.read( max( len(codec.magic) for codec in _codecs.itervalues() ) )
+  for codec in _codecs.itervalues():
+    if header.startswith( codec.magic ):
+      return codec
+  return None
+
+class _StreamFile( object ):
+  """
+  Minimal file interface over the streaming compressors which do not provide
+  their own file object.
+  """
+  def __init__(self, stream, fileobj, finish):
+    self._stream = stream
+    self._fileobj = fileobj
+    self._finish = finish
+
+  def write(self, data):
+    return self._stream.write( data )
+
+  def close(self):
+    self._finish( self._stream )
+    self._fileobj.close()
+
+def _openGzip( filename, mode, level ):
+  return gzip.GzipFile( filename, mode, compresslevel = 9 if level is None else level )
+
+def _openBz2( filename, mode, level ):
+  import bz2
+  return bz2.BZ2File( filename, mode, compresslevel = 9 if level is None else level )
+
+def _openXz( filename, mode, level ):
+  try:
+    import lzma
+  except ImportError:
+    from backports import lzma
+  if 'r' in mode:
+    return lzma.LZMAFile( filename, mode )
+  return lzma.LZMAFile( filename, mode, preset = level )
+
+def _openZstd( filename, mode, level ):
+  import zstandard
+  if 'r' in mode:
+    # The zstd reader does not provide readline, needed by cPickle, so the
+    # file is decompressed at once. Frames written by stream_writer do not
+    # record their content size, which requires using decompressobj.
+    with open( filename, 'rb' ) as f:
+      data = zstandard.ZstdDecompressor().decompressobj().decompress( f.read() )
+    # cStringIO shares the string buffer and is read natively by cPickle
+    from cStringIO import StringIO as cStringIO
+    return cStringIO( data )
+  f = open( filename, 'wb' )
+  cctx = zstandard.ZstdCompressor( level = 3 if level is None else level )
+  return _StreamFile( cctx.stream_writer( f ), f, lambda s: s.flush( zstandard.FLUSH_FRAME ) )
+
+def _openLz4( filename, mode, level ):
+  import lz4.frame
+  if 'r' in mode:
+    return lz4.frame.open( filename, mode )
+  return lz4.frame.open( filename, mode, compression_level = 0 if level is None else level )
+
+registerCodec( CompressionCodec( 'gzip', ('gz', 'gzip'), '\x1f\x8b',             _openGzip ) )
+registerCodec( CompressionCodec( 'bz2',  ('bz2',),       'BZh',                  _openBz2  ) )
+registerCodec( CompressionCodec( 'xz',   ('xz',),        '\xfd7zXZ\x00',         _openXz   ) )
+registerCodec( CompressionCodec( 'zstd', ('zst', 'zstd'),'\x28\xb5\x2f\xfd',     _openZstd ) )
+registerCodec( CompressionCodec( 'lz4',  ('lz4',),       '\x04\x22\x4d\x18',     _openLz4  ) )
 
 def save(o, filename, **kw):
   """
     Save an object to disk.
+
+    -> compress: when pickling, the compression codec name (see
+    registerCodec). True is the same as 'gzip' and False disables
+    compression;
+    -> level: the compression level, when not specified use the codec
+    default;
+    -> protocol: the pickle protocol, or one of the strings 'mat',
+    'savez_compressed', 'savez' or 'save' to export using scipy/numpy. Use
+    'oob' to pickle the object with its numpy arrays stored out-of-band as
+    aligned raw blocks, which load maps back to memory without copying.
+    Use 'chunked' to append o to a directory of chunks: numpy arrays are
+    appended as rows and lists as records, only the new chunk is written;
+    -> lock: whether to lock file while writing it;
+    -> lockTimeout: maximum time (in seconds) waiting for the file lock, None
+    waits forever;
+    -> atomic: write to a temporary file on the same directory which is
+    renamed to filename once it is complete. The lock is only held for the
+    rename, and readers never see partially written files;
+    -> fsync: flush the file contents to the disk before returning;
+    -> dryrun: only return the output file name.
   """
   compress = kw.pop( 'compress', True  )
+  level    = kw.pop( 'level',    None  )
   protocol = kw.pop( 'protocol', -1    )
   lock     = kw.pop( 'lock',     True  )
+  lockTimeout = kw.pop( 'lockTimeout', None )
+  atomic   = kw.pop( 'atomic',   False )
+  fsync    = kw.pop( 'fsync',    False )
   dryrun   = kw.pop( 'dryrun',   False )
   if not isinstance(filename, str):
     raise("Filename must be a string!")
@@ -89,66 +415,469 @@ def save(o, filename, **kw):
       if dryrun: return filename
       try:
         import scipy.io
-        if lock: lockFile = watchLock( filename )
-        scipy.io.savemat( filename, o)
       except ImportError, e:
         raise ImportError( "Exporting data in matlab extension is not available. Reason: %s" % e )
-    elif protocol == "savez_compressed":
-      filename = ensureExtension(filename, 'npz')
-      if dryrun: return filename
-      if lock: lockFile = watchLock( filename )
-      if type(o) is dict:
-        np.savez_compressed(filename, **o)
-      else:
-        if not isinstance(o, (list,tuple) ):
-          o = (o,)
-        np.savez_compressed(filename, *o)
-    elif protocol == "savez":
+      def write( path ):
+        scipy.io.savemat( path, o, appendmat = False )
+    elif protocol in ("savez_compressed", "savez"):
       filename = ensureExtension(filename, 'npz')
       if dryrun: return filename
-      if lock: lockFile = watchLock( filename )
-      if type(o) is dict:
-        np.savez(filename, **o)
-      else:
-        if not isinstance(o, (list,tuple) ):
-          o = (o,)
-        np.savez(filename, *o)
+      savez = np.savez_compressed if protocol == "savez_compressed" else np.savez
+      def write( path ):
+        with open( path, 'wb' ) as f:
+          if type(o) is dict:
+            savez(f, **o)
+          else:
+            savez(f, *( o if isinstance(o, (list,tuple) ) else (o,) ) )
     elif protocol == "save":
       filename = ensureExtension(filename, 'npy')
       if dryrun: return filename
-      if lock: lockFile = watchLock( filename )
-      np.save(filename, o)
+      def write( path ):
+        with open( path, 'wb' ) as f:
+          np.save(f, o)
+    elif protocol == "oob":
+      filename = ensureExtension(filename, 'pic.oob')
+      if dryrun: return filename
+      def write( path ):
+        with open( path, 'wb' ) as f:
+          __save_oob( o, f )
+    elif protocol == "chunked":
+      filename = ensureExtension(filename, 'chunks')
+      if dryrun: return filename
+      # Appending is always atomic: the chunk list is only updated after
+      # the new chunk is written
+      if lock: lockFile = watchLock( filename, timeout = lockTimeout )
+      __chunked_append( o, filename, compress, level, fsync )
+      if lock: lockFile.delete()
+      return filename
     else:
       raise ValueError("Unknown protocol '%s'" % protocol)
   elif type(protocol) is int:
     if compress:
-      filename = ensureExtension(filename, 'pic.gz')
+      codec = getCodec( 'gzip' if compress is True else compress )
+      filename = ensureExtension(filename, 'pic.' + codec.extensions[0])
       if dryrun: return filename
-      if lock: lockFile = watchLock( filename )
-      f = gzip.GzipFile(filename, 'wb')
+      def write( path ):
+        f = codec.open(path, 'wb', level)
+        cPickle.dump(o, f, protocol)
+        f.close()
     else:
       filename = ensureExtension(filename, 'pic')
       if dryrun: return filename
-      if lock: lockFile = watchLock( filename )
-      f = open(filename, 'w')
-    cPickle.dump(o, f, protocol)
+      def write( path ):
+        with open(path, 'wb') as f:
+          cPickle.dump(o, f, protocol)
+  lockFcn = ( lambda: watchLock( filename, timeout = lockTimeout ) ) if lock else None
+  if atomic:
+    __atomic_write( filename, write, fsync, lockFcn )
+  else:
+    if lock: lockFile = lockFcn()
+    write( filename )
+    if fsync: __fsync( filename )
+    if lock: lockFile.delete()
+  return filename
+
+def __fsync( path ):
+  """
+  Flush path contents to the disk.
+  """
+  fd = os.open( path, os.O_RDONLY )
+  try:
+    os.fsync( fd )
+  finally:
+    os.close( fd )
+
+def __atomic_write( filename, write, fsync = False, lockFcn = None ):
+  """
+  Call write(path) with a temporary file at the filename directory, which is
+  then renamed to filename. Thus readers find either the previous or the new
+  filename contents, but never a partially written file.
+
+  -> fsync: flush the file and the directory entry to the disk;
+  -> lockFcn: function returning the lock held (only) during the rename.
+  """
+  dirplace = os.path.dirname( filename )
+  fd, tmpName = tempfile.mkstemp( dir = dirplace, prefix = '.' + os.path.basename( filename ) + '.', suffix = '.tmp' )
+  os.close( fd )
+  try:
+    write( tmpName )
+    # mkstemp creates the file only readable by its owner
+    umask = os.umask( 0 ); os.umask( umask )
+    os.chmod( tmpName, 0666 & ~umask )
+    if fsync: __fsync( tmpName )
+    lockFile = lockFcn() if lockFcn is not None else None
+    try:
+      os.rename( tmpName, filename )
+    finally:
+      if lockFile is not None: lockFile.delete()
+  except:
+    if os.path.exists( tmpName ): os.remove( tmpName )
+    raise
+  if fsync: __fsync( dirplace )
+
+_oobMagic = '\x93RCOOB\x01\x00'
+_oobAlignment = 64
+
+def __oob_align( offset ):
+  return offset + ( -offset % _oobAlignment )
+
+def __save_oob( o, f ):
+  """
+  Write o into file f using the out-of-band buffers container: the object
+  skeleton is pickled with its numpy arrays replaced by references to raw
+  blocks which are written afterwards, each one aligned to _oobAlignment.
+  """
+  import struct
+  arrays, arrayIdx = [], {}
+  def persistent_id( obj ):
+    if type(obj) is np.ndarray and not obj.dtype.hasobject:
+      if id(obj) not in arrayIdx:
+        arrayIdx[id(obj)] = len(arrays)
+        arrays.append( obj )
+      return str( arrayIdx[id(obj)] )
+    return None
+  skeleton = StringIO.StringIO()
+  pickler = cPickle.Pickler( skeleton, -1 )
+  pickler.persistent_id = persistent_id
+  pickler.dump( o )
+  blocks, descrs = [], []
+  offset = 0
+  for arr in arrays:
+    if arr.flags.c_contiguous:
+      order, block = 'C', arr
+    elif arr.flags.f_contiguous:
+      order, block = 'F', arr.T
+    else:
+      order, block = 'C', np.ascontiguousarray( arr )
+    descrs.append( ( np.lib.format.dtype_to_descr( arr.dtype ), arr.shape, order, offset, arr.nbytes ) )
+    blocks.append( block )
+    offset = __oob_align( offset + arr.nbytes )
+  header = cPickle.dumps( { 'arrays' : descrs, 'skeleton' : skeleton.getvalue() }, -1 )
+  f.write( _oobMagic )
+  f.write( struct.pack( '<Q', len(header) ) )
+  f.write( header )
+  dataStart = __oob_align( len(_oobMagic) + 8 + len(header) )
+  f.write( '\x00' * ( dataStart - f.tell() ) )
+  for (_, _, _, offset, nbytes), block in zip( descrs, blocks ):
+    if nbytes:
+      f.write( '\x00' * ( dataStart + offset - f.tell() ) )
+      f.write( block.data )
+
+def __load_oob( filename ):
+  """
+  Read an out-of-band buffers container. The numpy arrays are returned as
+  read-only views on the memory mapped file.
+  """
+  import struct, mmap
+  with open( filename, 'rb' ) as f:
+    if f.read( len(_oobMagic) ) != _oobMagic:
+      raise IOError("File %s is not an out-of-band buffers container." % filename)
+    hLen, = struct.unpack( '<Q', f.read( 8 ) )
+    header = cPickle.loads( f.read( hLen ) )
+    dataStart = __oob_align( len(_oobMagic) + 8 + hLen )
+    if any( nbytes for _, _, _, _, nbytes in header['arrays'] ):
+      mm = mmap.mmap( f.fileno(), 0, access = mmap.ACCESS_READ )
+  arrays = []
+  for descr, shape, order, offset, nbytes in header['arrays']:
+    dtype = np.dtype( descr )
+    if nbytes:
+      arr = np.frombuffer( mm, dtype, nbytes // dtype.itemsize, dataStart + offset )
+    else:
+      arr = np.empty( 0, dtype )
+    arrays.append( arr.reshape( shape[::-1] ).T if order == 'F' else arr.reshape( shape ) )
+  unpickler = cPickle.Unpickler( StringIO.StringIO( header['skeleton'] ) )
+  unpickler.persistent_load = lambda pid: arrays[int(pid)]
+  return unpickler.load()
+
+from numpy.lib.npyio import NpzFile
+
+class LazyNpzFile( NpzFile ):
+  """
+    NpzFile which only reads an archive key when it is accessed. Members
+    stored without compression (written by np.savez) are memory mapped in
+    place, while compressed members (np.savez_compressed) are decompressed on
+    their first access and kept for later uses.
+  """
+
+  def __init__(self, filename, mmap_mode = 'r', allow_pickle = False):
+    NpzFile.__init__( self, open( filename, 'rb' ), own_fid = True, allow_pickle = allow_pickle )
+    self.filename = filename
+    self.mmap_mode = mmap_mode
+    self._cache = {}
+
+  def __getitem__(self, key):
+    if key in self._cache:
+      return self._cache[key]
+    member = key if key in self._files else key + '.npy'
+    val = None
+    if self.mmap_mode is not None and member in self._files:
+      import zipfile
+      info = self.zip.getinfo( member )
+      if info.compress_type == zipfile.ZIP_STORED:
+        val = self.__mmap_member( info )
+    if val is None:
+      val = NpzFile.__getitem__( self, key )
+    self._cache[key] = val
+    return val
+
+  def close(self):
+    NpzFile.close( self )
+    self._cache = {}
+
+  def __mmap_member(self, info):
+    """
+      Memory map a stored zip member, returning None when the member cannot be
+      mapped (it is not a npy file, holds python objects or is empty).
+    """
+    import struct
+    from numpy.lib import format as npformat
+    with open( self.filename, 'rb' ) as f:
+      f.seek( info.header_offset )
+      localHeader = f.read( 30 )
+      if localHeader[:4] != 'PK\x03\x04':
+        return None
+      nameLen, extraLen = struct.unpack( '<2H', localHeader[26:30] )
+      f.seek( info.header_offset + 30 + nameLen + extraLen )
+      if f.read( len(npformat.MAGIC_PREFIX) ) != npformat.MAGIC_PREFIX:
+        return None
+      f.seek( -len(npformat.MAGIC_PREFIX), os.SEEK_CUR )
+      version = npformat.read_magic( f )
+      if version == (1, 0):
+        shape, fortran, dtype = npformat.read_array_header_1_0( f )
+      elif version == (2, 0):
+        shape, fortran, dtype = npformat.read_array_header_2_0( f )
+      else:
+        return None
+      offset = f.tell()
+    if dtype.hasobject or not shape or not np.prod( shape ):
+      return None
+    return np.memmap( self.filename, dtype = dtype, mode = self.mmap_mode, shape = shape
+                    , order = 'F' if fortran else 'C', offset = offset )
+
+_chunkedManifest = 'manifest.pic'
+_chunkedVersion = 1
+
+def __read_chunked_manifest( dirname ):
+  """
+  Returns the manifest of a chunked store, None if it does not exist.
+  """
+  manifest = os.path.join( dirname, _chunkedManifest )
+  if not os.path.isfile( manifest ):
+    return None
+  with open( manifest, 'rb' ) as f:
+    return cPickle.load( f )
+
+def __write_chunked_manifest( dirname, manifest, fsync = False ):
+  """
+  Replace the manifest of a chunked store, so that readers see either the
+  previous or the new list of chunks.
+  """
+  def write( path ):
+    with open( path, 'wb' ) as f:
+      cPickle.dump( manifest, f, -1 )
+  __atomic_write( os.path.join( dirname, _chunkedManifest ), write, fsync )
+
+def __chunked_append( o, dirname, compress, level, fsync = False ):
+  """
+  Append o as a new chunk of the chunked store at dirname. Numpy arrays are
+  appended as rows of the stored array, while lists or tuples are appended as
+  records (any other object is appended as a single record).
+  """
+  if isinstance( o, np.ndarray ):
+    kind = 'array'
+    if not o.ndim:
+      raise ValueError("Cannot append a zero-dimensional array to a chunked store.")
+  else:
+    kind = 'records'
+    if not isinstance( o, (list, tuple) ):
+      o = [o]
+  manifest = __read_chunked_manifest( dirname )
+  if manifest is None:
+    mkdir_p( dirname )
+    manifest = { 'version' : _chunkedVersion, 'kind' : kind, 'chunks' : [] }
+    if kind == 'array':
+      manifest['dtype'] = o.dtype.descr if o.dtype.names else o.dtype.str
+      manifest['rowShape'] = o.shape[1:]
+  if manifest['kind'] != kind:
+    raise ValueError("Cannot append %s to the chunked store %s holding %s." % (kind, dirname, manifest['kind']))
+  chunkName = 'chunk_%06d' % len(manifest['chunks'])
+  if kind == 'array':
+    if o.dtype != np.dtype( manifest['dtype'] ) or o.shape[1:] != manifest['rowShape']:
+      raise ValueError("Array with dtype %s and rows shaped %r does not match chunked store %s (%s, %r)." % (
+                       o.dtype, o.shape[1:], dirname, np.dtype( manifest['dtype'] ), manifest['rowShape']) )
+    chunkName += '.npy'
+    np.save( os.path.join( dirname, chunkName ), o )
+  elif compress:
+    codec = getCodec( 'gzip' if compress is True else compress )
+    chunkName += '.pic.' + codec.extensions[0]
+    f = codec.open( os.path.join( dirname, chunkName ), 'wb', level )
+    cPickle.dump( list(o), f, -1 )
     f.close()
+  else:
+    chunkName += '.pic'
+    with open( os.path.join( dirname, chunkName ), 'wb' ) as f:
+      cPickle.dump( list(o), f, -1 )
+  manifest['chunks'].append( (chunkName, len(o)) )
+  if fsync: __fsync( os.path.join( dirname, chunkName ) )
+  __write_chunked_manifest( dirname, manifest, fsync )
+
+def __load_chunked( dirname, chunkSlice, transformDataRawData, useGenerator ):
+  """
+  Read the chunked store at dirname. Only the chunks overlapping chunkSlice are
+  read from disk.
+  """
+  manifest = __read_chunked_manifest( dirname )
+  if manifest is None:
+    raise ValueError("Directory %s is not a chunked store." % dirname)
+  total = sum( n for _, n in manifest['chunks'] )
+  if chunkSlice is None:
+    chunkSlice = slice(None)
+  elif not isinstance( chunkSlice, slice ):
+    chunkSlice = slice( *chunkSlice )
+  start, stop, step = chunkSlice.indices( total )
+  if step < 0:
+    raise ValueError("chunkSlice does not support negative steps.")
+  def readChunks():
+    cStart = 0
+    for chunkName, n in manifest['chunks']:
+      cStop = cStart + n
+      if cStart < stop and cStop > start:
+        path = os.path.join( dirname, chunkName )
+        if chunkName.endswith( '.npy' ):
+          data = np.load( path, mmap_mode = 'r' )
+        else:
+          data = load( path )
+        yield chunkName, data[ max(start - cStart, 0) : min(stop, cStop) - cStart ]
+      cStart = cStop
+  if manifest['kind'] == 'array':
+    if useGenerator:
+      # The step is applied relatively to the first requested row
+      def gen():
+        offset = 0
+        for chunkName, data in readChunks():
+          yield transformDataRawData( data[ -offset % step :: step ], dirname, chunkName )
+          offset += len(data)
+      return gen()
+    chunks = [ data for _, data in readChunks() ]
+    if chunks:
+      o = np.concatenate( chunks )[::step]
+    else:
+      o = np.empty( (0,) + tuple( manifest['rowShape'] ), dtype = np.dtype( manifest['dtype'] ) )
+    return transformDataRawData( o, dirname, None )
+  else:
+    def gen():
+      offset = 0
+      for chunkName, data in readChunks():
+        for record in data[ -offset % step :: step ]:
+          yield transformDataRawData( record, dirname, chunkName )
+        offset += len(data)
+    return gen() if useGenerator else list( gen() )
+
+def saveTar(members, filename, **kw):
+  """
+    Save a collection of objects as the members of a tarball.
+
+    -> members: a dict or a list of (memberName, object) pairs;
+    -> compress: when set, each member is compressed as an independent gzip
+    stream (blocked gzip), so that it can be decompressed without reading the
+    preceding members;
+    -> protocol: the pickle protocol used on each member;
+    -> createIndex: write the sidecar index used by load to seek directly to
+    the tarMember;
+    -> lock: whether to lock file while writing it;
+    -> lockTimeout: maximum time (in seconds) waiting for the file lock.
+  """
+  compress    = kw.pop( 'compress',    True )
+  protocol    = kw.pop( 'protocol',    -1   )
+  createIndex = kw.pop( 'createIndex', True )
+  lock        = kw.pop( 'lock',        True )
+  lockTimeout = kw.pop( 'lockTimeout', None )
+  if isinstance(members, dict):
+    members = members.iteritems()
+  filename = expandPath( filename )
+  filename = ensureExtension( filename, 'tgz|tar.gz' if compress else 'tar' )
+  dirplace = os.path.dirname(filename)
+  if not os.path.isdir( dirplace ) and dirplace:
+    mkdir_p( dirplace )
+  if lock: lockFile = watchLock( filename, timeout = lockTimeout )
+  index = { 'compressed' : compress, 'cblocks' : [], 'ublocks' : [], 'members' : {} }
+  uOffset = 0
+  with open(filename, 'wb') as f:
+    def writeBlock( data ):
+      if compress:
+        index['cblocks'].append( f.tell() )
+        index['ublocks'].append( uOffset )
+        gz = gzip.GzipFile( fileobj = f, mode = 'wb' )
+        gz.write( data )
+        gz.close()
+      else:
+        f.write( data )
+      return uOffset + len(data)
+    for memberName, o in members:
+      data = cPickle.dumps( o, protocol )
+      info = tarfile.TarInfo( memberName )
+      info.size = len(data)
+      info.mtime = time()
+      header = info.tobuf()
+      index['members'].setdefault( memberName, (uOffset + len(header), info.size) )
+      uOffset = writeBlock( header + data + tarfile.NUL * (-info.size % tarfile.BLOCKSIZE) )
+    # End of archive
+    uOffset = writeBlock( tarfile.NUL * ( 2 * tarfile.BLOCKSIZE ) )
+  index['usize'] = uOffset
+  if createIndex:
+    __write_tar_index( filename, index )
   if lock:
     lockFile.delete()
   return filename
 
+def __load_lock( filename, lock, lockTimeout, logger ):
+  """
+  Take the shared lock used by load, returns None when lock is not set or the
+  lock file cannot be created.
+  """
+  if not lock:
+    return None
+  if not os.access( os.path.dirname( filename ) or os.curdir, os.W_OK ):
+    ( logger or Logger.getModuleLogger( "load" ) ).debug( "Reading %s without lock: directory is not writable.", filename )
+    return None
+  try:
+    return watchLock( filename, shared = True, timeout = lockTimeout, logger = logger )
+  except (IOError, OSError), e:
+    if e.errno not in ( errno.EACCES, errno.EPERM, errno.EROFS ):
+      raise
+    ( logger or Logger.getModuleLogger( "load" ) ).debug( "Reading %s without lock: %s", filename, e )
+    return None
+
+def __release_after( gen, lockFile ):
+  """
+  Yields the contents of generator gen, releasing lockFile afterwards.
+  """
+  try:
+    for o in gen:
+      yield o
+  finally:
+    lockFile.delete()
+
 def load(filename, decompress = 'auto', allowTmpFile = True, useHighLevelObj = False,
          useGenerator = False, tarMember = None, ignore_zeros = True,
          extractAll = False, eraseTmpTarMembers = True,
          returnFileName = False, returnFileMember = False,
-         logger = None):
+         streamTar = True, useIndex = True, chunkSlice = None,
+         lock = False, lockTimeout = None, logger = None, iterative = False):
   """
     Loads an object from disk.
 
-    -> decompress: what protocol should be used to decompress the file.
+    -> decompress: what protocol should be used to decompress the file. When
+    set to 'auto', it is determined by the file extension or, if it is not
+    known, by the file first bytes. Use 'tgz', 'tar', False or the name of a
+    registered CompressionCodec.
     -> allowTmpFile: if to allow temporary files to improve loading speed.
     -> useHighLevelObj: automatic convert rawDicts to their python
-       representation (not currently supported for numpy files.
+       representation. npz archives are returned as a LazyNpzFile, which
+       only reads each array when it is accessed. npz archives holding a
+       rawDict are read at once when converting it, so that only their
+       uncompressed members (np.savez) remain memory mapped, while compressed
+       members (np.savez_compressed) are decompressed into memory.
     -> useGenerator: This option changes the behavior when loading a tarball
        file with multiple members. Instead returning a collection with all
        contents within the file, it will return a generator allowing each file
@@ -163,53 +892,417 @@ def load(filename, decompress = 'auto', allowTmpFile = True, useHighLevelObj = F
     -> eraseTmpTarMembers: whether to erase tar members after reading them
     -> returnFileName: whether to return file name
     -> returnFileMember: whether to return file member object at the tar file
+    -> streamTar: read tarball members in a single pass within this process,
+    unpickling each member as soon as it is decompressed. When set to False,
+    an external tar process is used to extract the members into temporary
+    files (this is always the case when extractAll is set).
+    -> useIndex: when reading a tarMember, use the sidecar index created by
+    saveTar/createTarIndex (if available) to seek directly to the member.
+    -> chunkSlice: when reading a chunked store (see save), a slice or a
+    (start, stop[, step]) tuple with the rows or records to be read. Only
+    the chunks within this range are read.
+    -> lock: take a shared lock on the file while reading it, so that it is
+    not read while another process saves it. The lock file is created next to
+    the file and removed by the last reader. The lock is not taken when the
+    file directory is not writable. It is not needed for files written by
+    save with atomic set;
+    -> lockTimeout: maximum time (in seconds) waiting for the file lock, None
+    waits forever;
+    -> iterative: when using useHighLevelObj, convert rawDicts using
+    materialize instead of retrieveRawDict. It does not hit the recursion
+    limit on deep trees and builds rawDicts shared within the tree only once,
+    but the children are built before their parents converters run (see
+    materialize).
   """
   filename = expandPath( filename )
-  transformDataRawData = __TransformDataRawData( useHighLevelObj, returnFileName, returnFileMember )
+  transformDataRawData = __TransformDataRawData( useHighLevelObj, returnFileName, returnFileMember, iterative )
+  if os.path.isdir( filename ) and checkExtension( filename, 'chunks' ):
+    return __load_chunked( filename, chunkSlice, transformDataRawData, useGenerator )
   if not os.path.isfile( filename ):
     raise ValueError("Cannot reach file %s" % filename )
-  if checkExtension( filename, 'npy|npz'):
-    o = transformDataRawData( np.load(filename,mmap_mode='r'), filename, None )
-    return [o] if useGenerator else o
-  else:
-    if decompress == 'auto':
-      if checkExtension( filename, 'tar.gz|tgz' ):
-        decompress = 'tgz'
-      elif checkExtension( filename, 'gz|gzip' ):
-        decompress = 'gzip'
-      elif checkExtension( filename, 'tar' ):
-        decompress = 'tar'
-      elif checkExtension( filename, '.pic' ):
-        decompress = False
-      else:
-        raise RuntimeError("It is not possible to read format: '.%s'. Input file was: '%s'." % (
-          getExtension(filename, None),
-          filename) )
-    if decompress == 'gzip':
-      f = gzip.GzipFile(filename, 'rb')
-    elif decompress in ('tgz', 'tar'):
-      args = (allowTmpFile, transformDataRawData,
-              tarMember, extractAll, eraseTmpTarMembers,
-              ignore_zeros, logger,)
-      if decompress == 'tar':
-        o = __load_tar(filename, 'r:', *args)
-      else:
-        o = __load_tar(filename, 'r:gz', *args)
-      if not useGenerator:
-        #o = list(map(lambda x: x[0], o))
-        o = list(o)
-        if len(o) == 1: o = o[0]
-      return o
+  lockFile = __load_lock( filename, lock, lockTimeout, logger )
+  try:
+    if checkExtension( filename, 'npz'):
+      o = transformDataRawData( LazyNpzFile(filename,mmap_mode='r'), filename, None )
+      return [o] if useGenerator else o
+    elif checkExtension( filename, 'npy'):
+      o = transformDataRawData( np.load(filename,mmap_mode='r'), filename, None )
+      return [o] if useGenerator else o
+    elif checkExtension( filename, 'oob' ):
+      o = transformDataRawData( __load_oob(filename), filename, None )
+      return [o] if useGenerator else o
     else:
-      f = open(filename,'r')
-    o = cPickle.load(f)
-    f.close()
-    o = transformDataRawData( o, filename, None )
-    return [o] if useGenerator else o
+      if decompress == 'auto':
+        if checkExtension( filename, 'tar.gz|tgz' ):
+          decompress = 'tgz'
+        elif checkExtension( filename, 'tar' ):
+          decompress = 'tar'
+        else:
+          codec = _codecFromFileName( filename ) or _codecFromMagic( filename )
+          if codec is not None:
+            decompress = codec.name
+          elif checkExtension( filename, '.pic' ):
+            decompress = False
+          else:
+            raise RuntimeError("It is not possible to read format: '.%s'. Input file was: '%s'." % (
+              getExtension(filename, None),
+              filename) )
+      if decompress in _codecs:
+        f = getCodec( decompress ).open(filename, 'rb')
+      elif decompress in ('tgz', 'tar'):
+        index = None
+        if useIndex and tarMember is not None and not extractAll:
+          index = __read_tar_index( filename )
+        if index is not None:
+          o = __load_tar_indexed(filename, index, transformDataRawData, tarMember)
+        elif ( streamTar and not extractAll ) or not allowTmpFile:
+          o = __stream_tar(filename, decompress, transformDataRawData,
+                           tarMember, ignore_zeros)
+        else:
+          args = (allowTmpFile, transformDataRawData,
+                  tarMember, extractAll, eraseTmpTarMembers,
+                  ignore_zeros, logger,)
+          if decompress == 'tar':
+            o = __load_tar(filename, 'r:', *args)
+          else:
+            o = __load_tar(filename, 'r:gz', *args)
+        if not useGenerator:
+          #o = list(map(lambda x: x[0], o))
+          o = list(o)
+          if len(o) == 1: o = o[0]
+        elif lockFile is not None:
+          o, lockFile = __release_after( o, lockFile ), None
+        return o
+      else:
+        f = open(filename,'r')
+      o = cPickle.load(f)
+      f.close()
+      o = transformDataRawData( o, filename, None )
+      return [o] if useGenerator else o
+  finally:
+    if lockFile is not None:
+      lockFile.delete()
   # end of (if filename)
 # end of (load)
 
 
+def _load_many_worker( args ):
+  """
+  Internal method used by load_many to load a file on the process pool
+  """
+  idx, filename, kw = args
+  start = time()
+  o = load( filename, **kw )
+  return idx, o, time() - start
+
+def load_many(paths, workers = None, ordered = True, maxInFlight = None,
+              filters = None, logger = None, level = None, **kw):
+  """
+    Loads several files using a process pool. Returns a generator yielding
+    each loaded object as soon as it is available.
+
+    -> paths: the files or folders to load, expanded using expandFolders. The
+    files found within each folder (or glob) are sorted, while the order of
+    paths is kept. Files repeated on paths or matching several filters are
+    loaded only once;
+    -> workers: the number of processes used to load the files. When not
+    specified, OMP_NUM_THREADS is used;
+    -> ordered: whether to yield the objects in the same order as the expanded
+    paths. Otherwise, objects are yielded as soon as they are loaded;
+    -> maxInFlight: the maximum number of files being loaded or waiting to be
+    consumed, which bounds the memory used in the process. Defaults to twice
+    the number of workers;
+    -> filters: the filters passed to expandFolders;
+    -> logger: whether to show progress and throughput using logger;
+    -> level: logging level to print messages with logger;
+    -> kw: remaining arguments are passed to load. useGenerator is not
+    supported.
+  """
+  if filters is None:
+    filters = ['*']
+  if not( type( filters ) in (list,tuple,) ):
+    filters = [ filters ]
+  from RingerCore import traverse
+  expanded = []
+  for path in traverse( paths, simple_ret = True ):
+    files = expandFolders( path, filters )
+    if len(filters) > 1:
+      files = [ f for filterFiles in files for f in filterFiles ]
+    # Only sort the files found by listing folders or matching globs
+    if not os.path.isfile( expandPath( path ) ):
+      files = sorted( files )
+    expanded.extend( files )
+  seen = set()
+  paths = [ path for path in expanded if not( path in seen or seen.add( path ) ) ]
+  kw['useGenerator'] = False
+  if workers is None:
+    from RingerCore.Configure import OMP_NUM_THREADS
+    workers = OMP_NUM_THREADS
+  workers = max( min( workers, len(paths) ), 1 )
+  if maxInFlight is None:
+    maxInFlight = 2 * workers
+  maxInFlight = max( maxInFlight, 1 )
+  # Throughput of the last loaded file and of the whole task, in MB/s
+  stats = { 'start' : time(), 'size' : 0., 'last' : None }
+  def throughput():
+    if stats['last'] is None: return ''
+    return " (%.2f MB/s, total %.2f MB/s)" % ( stats['last'],
+        stats['size'] / max( time() - stats['start'], 1e-9 ) )
+  from RingerCore.util import progressbar
+  return progressbar( __load_many( paths, workers, ordered, maxInFlight, stats, kw ),
+                      len(paths), 'Loading files: ', 60, 1,
+                      True if logger is not None else False, logger = logger,
+                      level = level, suffix = throughput )
+
+def __load_many( paths, workers, ordered, maxInFlight, stats, kw ):
+  """
+  Internal generator for load_many
+  """
+  def report( idx, elapsed ):
+    size = os.path.getsize( paths[idx] ) / 1024.**2
+    stats['size'] += size
+    stats['last'] = size / elapsed if elapsed else float('inf')
+  if workers == 1:
+    for idx in xrange(len(paths)):
+      idx, o, elapsed = _load_many_worker( (idx, paths[idx], kw) )
+      report( idx, elapsed )
+      yield o
+    return
+  from multiprocessing import Pool
+  from threading import Semaphore
+  # The pool consumes the tasks on its own thread, which waits here until the
+  # number of files in flight is below maxInFlight
+  slots = Semaphore( maxInFlight )
+  stop = []
+  def tasks():
+    for idx, path in enumerate( paths ):
+      slots.acquire()
+      if stop: return
+      yield idx, path, kw
+  def release():
+    stop.append( True )
+    slots.release()
+  pool = Pool( workers )
+  try:
+    imap = pool.imap if ordered else pool.imap_unordered
+    for idx, o, elapsed in imap( _load_many_worker, tasks() ):
+      slots.release()
+      report( idx, elapsed )
+      yield o
+  except KeyboardInterrupt:
+    release()
+    pool.terminate()
+    raise
+  finally:
+    release()
+    # Let the in-flight files finish instead of terminating the workers, which
+    # may deadlock when they are sending large objects back
+    pool.close()
+    pool.join()
+
+def __stream_tar(filename, decompress, transformDataRawData, tarMember,
+                 ignore_zeros):
+  """
+  Internal method for reading tarfiles as a stream.
+
+  The archive is walked only once and each member is unpickled directly from
+  memory, so no temporary files or external processes are needed. The gzip
+  layer is handled by GzipFile, which also reads merged files made of
+  concatenated gzip streams.
+  """
+  if tarMember is None:
+    memberName = None
+  elif type(tarMember) is tarfile.TarInfo:
+    memberName = tarMember.name
+  elif type(tarMember) is str:
+    memberName = tarMember
+  else:
+    raise TypeError("tarMember argument must be TarInfo, str or None.")
+  if decompress == 'tgz':
+    fileobj = gzip.GzipFile(filename, 'rb')
+  else:
+    fileobj = open(filename, 'rb')
+  try:
+    f = tarfile.open(fileobj = fileobj, mode = 'r|', ignore_zeros = ignore_zeros)
+    for entry in f:
+      if not entry.isfile():
+        continue
+      if memberName is not None and entry.name != memberName:
+        continue
+      # Reading the member at once is much faster than letting cPickle
+      # request the data through the python file interface
+      data = f.extractfile(entry).read()
+      if checkExtension( entry.name, 'gz|gzip' ):
+        data = gzip.GzipFile( fileobj = StringIO.StringIO( data ) ).read()
+      yield transformDataRawData( cPickle.loads(data), filename, entry.name )
+      if memberName is not None:
+        break
+    else:
+      if memberName is not None:
+        raise KeyError("Member %s not found on file %s." % (memberName, filename))
+  finally:
+    fileobj.close()
+# end of (stream_tar)
+
+def __tar_index_name( filename ):
+  """
+  Returns the sidecar index path for filename
+  """
+  return filename + '.idx'
+
+def __tar_index_stat( filename ):
+  """
+  Returns the tarball attributes used to detect whether an index is outdated
+  """
+  st = os.stat( filename )
+  return { 'filesize' : st.st_size
+         , 'mtime' : st.st_mtime
+         , 'inode' : (st.st_dev, st.st_ino) }
+
+def __write_tar_index( filename, index ):
+  """
+  Dump the tarball index on its sidecar file
+  """
+  index['version'] = 2
+  index.update( __tar_index_stat( filename ) )
+  indexName = __tar_index_name( filename )
+  with open( indexName, 'wb' ) as f:
+    cPickle.dump( index, f, -1 )
+  return indexName
+
+def __read_tar_index( filename ):
+  """
+  Returns the tarball index or None if it is not available or does not match
+  the tarball anymore.
+  """
+  indexName = __tar_index_name( filename )
+  if not os.path.isfile( indexName ):
+    return None
+  with open( indexName, 'rb' ) as f:
+    index = cPickle.load( f )
+  if index.get('version') != 2 or any( index.get( key ) != value
+      for key, value in __tar_index_stat( filename ).iteritems() ):
+    Logger.getModuleLogger( __name__ ).warning( "Ignoring outdated index %s.", indexName )
+    return None
+  return index
+
+def __gzip_blocks( filename, chunkSize = 1 << 18 ):
+  """
+  Returns the compressed and uncompressed offsets where each gzip stream
+  composing filename starts, as well as the total uncompressed size.
+  """
+  import zlib
+  cblocks, ublocks = [], []
+  cOffset = uOffset = 0
+  d = None
+  pending = ''
+  with open( filename, 'rb' ) as f:
+    while True:
+      data = pending or f.read( chunkSize )
+      pending = ''
+      if not data:
+        break
+      if d is None:
+        # Skip zero padding between streams, as done by GzipFile
+        lData = len(data)
+        data = data.lstrip( '\x00' )
+        cOffset += lData - len(data)
+        if not data:
+          continue
+        cblocks.append( cOffset ); ublocks.append( uOffset )
+        d = zlib.decompressobj( 16 + zlib.MAX_WBITS )
+      uOffset += len( d.decompress( data ) )
+      if d.unused_data:
+        pending = d.unused_data
+        cOffset += len(data) - len(pending)
+        uOffset += len( d.flush() )
+        d = None
+      else:
+        cOffset += len(data)
+  return cblocks, ublocks, uOffset
+
+def createTarIndex( filename ):
+  """
+  Create the sidecar index for tar/tgz filename, which allows load to access
+  a tarMember without scanning the archive. Gzip compressed archives are
+  indexed on their gzip stream boundaries, so that members from blocked
+  archives (created by saveTar or by merging tgz files) are reached by
+  decompressing only the stream in which they start.
+
+  Returns the index path.
+  """
+  filename = expandPath( filename )
+  compressed = checkExtension( filename, 'tar.gz|tgz' )
+  if compressed:
+    cblocks, ublocks, usize = __gzip_blocks( filename )
+    fileobj = gzip.GzipFile( filename, 'rb' )
+  else:
+    cblocks, ublocks, usize = [], [], os.path.getsize( filename )
+    fileobj = open( filename, 'rb' )
+  members = {}
+  try:
+    f = tarfile.open( fileobj = fileobj, mode = 'r|', ignore_zeros = True )
+    for entry in f:
+      if entry.isfile():
+        members.setdefault( entry.name, (entry.offset_data, entry.size) )
+  finally:
+    fileobj.close()
+  return __write_tar_index( filename, { 'compressed' : compressed
+                                      , 'cblocks' : cblocks
+                                      , 'ublocks' : ublocks
+                                      , 'usize' : usize
+                                      , 'members' : members } )
+
+def __merge_tar_indexes( flist, ofile ):
+  """
+  Create ofile index by shifting the indexes of the merged files. Returns
+  False when any of the indexes is not available.
+  """
+  indexes = [ __read_tar_index( fname ) for fname in flist ]
+  if not indexes or any( index is None for index in indexes ) or \
+      len( set( index['compressed'] for index in indexes ) ) != 1:
+    return False
+  merged = { 'compressed' : indexes[0]['compressed']
+           , 'cblocks' : [], 'ublocks' : [], 'members' : {} }
+  cOffset = uOffset = 0
+  for index in indexes:
+    merged['cblocks'].extend( cOffset + c for c in index['cblocks'] )
+    merged['ublocks'].extend( uOffset + u for u in index['ublocks'] )
+    for memberName, (offset, size) in index['members'].iteritems():
+      merged['members'].setdefault( memberName, (uOffset + offset, size) )
+    cOffset += index['filesize']
+    uOffset += index['usize']
+  merged['usize'] = uOffset
+  __write_tar_index( ofile, merged )
+  return True
+
+def __load_tar_indexed(filename, index, transformDataRawData, tarMember):
+  """
+  Internal method for reading a tarMember using the tarball index
+  """
+  memberName = tarMember.name if type(tarMember) is tarfile.TarInfo else tarMember
+  try:
+    offset, size = index['members'][memberName]
+  except KeyError:
+    raise KeyError("Member %s not found on file %s." % (memberName, filename))
+  with open( filename, 'rb' ) as raw:
+    if index['compressed']:
+      from bisect import bisect_right
+      bIdx = bisect_right( index['ublocks'], offset ) - 1
+      raw.seek( index['cblocks'][bIdx] )
+      f = gzip.GzipFile( fileobj = raw, mode = 'rb' )
+      skip = offset - index['ublocks'][bIdx]
+      # Discard data until reaching member (GzipFile.seek reads in small chunks)
+      while skip:
+        skip -= len( f.read( min( skip, 1 << 20 ) ) )
+    else:
+      raw.seek( offset )
+      f = raw
+    data = f.read( size )
+  if checkExtension( memberName, 'gz|gzip' ):
+    data = gzip.GzipFile( fileobj = StringIO.StringIO( data ) ).read()
+  yield transformDataRawData( cPickle.loads(data), filename, memberName )
+
 def __load_tar(filename, mode, allowTmpFile, transformDataRawData, tarMember,
                extractAll, eraseTmpTarMembers, ignore_zeros, logger = None):
   """
@@ -320,27 +1413,202 @@ class __TransformDataRawData( object ):
   Transforms raw data if requested to use high level object
   """
 
-  def __init__(self, useHighLevelObj, returnFileName, returnFileMember,):
+  def __init__(self, useHighLevelObj, returnFileName, returnFileMember, iterative = False):
     self.useHighLevelObj = useHighLevelObj
     self.returnFileName = returnFileName
     self.returnFileMember = returnFileMember
+    self.iterative = iterative
 
   def __call__(self, o, fname, tmember):
     """
     Run transformation
     """
     if self.useHighLevelObj:
-      from RingerCore.RawDictStreamable import retrieveRawDict
-      from numpy.lib.npyio import NpzFile
-      if type(o) is NpzFile:
+      from RingerCore.RawDictStreamable import retrieveRawDict, materialize, RawDictCnv
+      if isinstance(o, NpzFile) and all( attr in o for attr in RawDictCnv.baseAttrs ):
+        # Only rawDicts need to be expanded. This reads every member, so
+        # only uncompressed members remain memory mapped after this point
         o = dict(o)
-      o = retrieveRawDict( o )
+      o = materialize( o ) if self.iterative else retrieveRawDict( o )
     from RingerCore.util import appendToOutput
     o = appendToOutput( o, self.returnFileName,   fname   )
     o = appendToOutput( o, self.returnFileMember, tmember )
     return o
 
-def expandFolders( pathList, filters = None, logger = None, level = None):
+try:
+  from os import scandir as _scandir
+except ImportError:
+  try:
+    from scandir import scandir as _scandir
+  except ImportError:
+    _scandir = None
+
+def _listDir( path ):
+  """
+  Returns the list of (name, isDir, isLink, isFile) entries in directory path.
+  isDir and isFile follow symbolic links, and isFile is only set for regular
+  files.
+  """
+  if _scandir is not None:
+    return [ (entry.name, entry.is_dir(), entry.is_symlink(), entry.is_file()) for entry in _scandir( path ) ]
+  import stat
+  ret = []
+  for name in os.listdir( path ):
+    fullpath = os.path.join( path, name )
+    try:
+      mode = os.lstat( fullpath ).st_mode
+    except OSError:
+      continue
+    if stat.S_ISLNK( mode ):
+      ret.append( (name, os.path.isdir( fullpath ), True, os.path.isfile( fullpath )) )
+    else:
+      ret.append( (name, stat.S_ISDIR( mode ), False, stat.S_ISREG( mode )) )
+  return ret
+
+class ListingCache( object ):
+  """
+  Cache of folder listings, which are reused while the folder modification
+  time is unchanged. Folders are identified by their absolute paths.
+
+  -> filename: file where the cache is persisted by save. When it exists, the
+  cache is read from it;
+  -> minAge: folders modified less than minAge seconds ago are not cached,
+  since changes within the file system time resolution would be missed.
+  """
+
+  _version = 2
+
+  def __init__( self, filename = None, minAge = 2. ):
+    if filename is not None:
+      filename = ensureExtension( expandPath( filename ), 'pic' )
+    self.filename = filename
+    self.minAge = minAge
+    self._entries = {}
+    if filename is not None and os.path.isfile( filename ):
+      cache = load( filename )
+      # Caches written with another listing format are discarded
+      if cache.get( 'version' ) == self._version:
+        self._entries = cache['entries']
+
+  def listDir( self, path ):
+    """
+    Returns the list of (name, isDir, isLink, isFile) entries in folder path
+    (see _listDir).
+    """
+    path = os.path.abspath( path )
+    mtime = os.stat( path ).st_mtime
+    entry = self._entries.get( path )
+    if entry is not None and entry[0] == mtime:
+      return entry[1]
+    listing = _listDir( path )
+    if time() - mtime > self.minAge:
+      self._entries[path] = ( mtime, listing )
+    else:
+      self._entries.pop( path, None )
+    return listing
+
+  def clear( self ):
+    self._entries = {}
+
+  def save( self, filename = None ):
+    """
+    Persist the cache into filename (defaults to the filename used when
+    creating it).
+    """
+    filename = filename or self.filename
+    if filename is None:
+      raise ValueError("No filename specified to save the listing cache.")
+    self.filename = save( { 'version' : self._version, 'entries' : self._entries },
+                          filename, compress = False, atomic = True )
+    return self.filename
+
+  def __len__( self ):
+    return len( self._entries )
+
+# Listing cache shared by the calls within this process
+_listingCache = ListingCache()
+
+def __listing_function( useCache ):
+  """
+  Returns the function listing folders according to the useCache option used
+  by expandFolders and getFiles.
+  """
+  if isinstance( useCache, ListingCache ):
+    return useCache.listDir
+  return _listingCache.listDir if useCache else _listDir
+
+def __compile_filters( filters ):
+  """
+  Compile the glob filters into (match, allowHidden) pairs. As with glob, the
+  files starting with a dot are only matched by filters starting with a dot.
+  """
+  import re, fnmatch
+  return [ ( re.compile( fnmatch.translate( filt ) ).match, filt.startswith('.') ) for filt in filters ]
+
+def __match_filters( name, matchers ):
+  """
+  Returns the indexes of the matchers accepting file name
+  """
+  hidden = name.startswith('.')
+  return [ idx for idx, (match, allowHidden) in enumerate( matchers )
+           if ( allowHidden or not hidden ) and match( name ) ]
+
+def __walk_folder( path, matchers, listDir ):
+  """
+  Yields the (filterIdx, filePath) pairs for the files within path and its
+  subfolders, which are visited depth first.
+  """
+  stack = [path]
+  while stack:
+    path = stack.pop()
+    folders = []
+    for name, isDir, isLink, _ in listDir( path ):
+      fullpath = os.path.join( path, name )
+      if isDir:
+        folders.append( expandPath( fullpath ) if isLink else fullpath )
+      else:
+        for idx in __match_filters( name, matchers ):
+          yield idx, fullpath
+    stack.extend( reversed( folders ) )
+
+def __walk_folder_list( args ):
+  """
+  Internal method used by expandFolders to walk subtrees on the thread pool
+  """
+  path, matchers, listDir = args
+  return list( __walk_folder( path, matchers, listDir ) )
+
+def __expand_folders( pathList, matchers, pool, listDir ):
+  """
+  Yields the (filterIdx, filePath) pairs for every path in pathList. When pool
+  is specified, the subfolders of each folder are walked in parallel.
+  """
+  for path in pathList:
+    path = expandPath( path )
+    if not os.path.exists( path ):
+      raise ValueError("Cannot reach path '%s'" % path )
+    if os.path.isdir( path ):
+      if pool is None:
+        for item in __walk_folder( path, matchers, listDir ):
+          yield item
+      else:
+        folders = []
+        for name, isDir, isLink, _ in listDir( path ):
+          fullpath = os.path.join( path, name )
+          if isDir:
+            folders.append( expandPath( fullpath ) if isLink else fullpath )
+          else:
+            for idx in __match_filters( name, matchers ):
+              yield idx, fullpath
+        for subtree in pool.imap( __walk_folder_list, [ (folder, matchers, listDir) for folder in folders ] ):
+          for item in subtree:
+            yield item
+    else:
+      for idx in __match_filters( os.path.basename( path ), matchers ):
+        yield idx, path
+
+def expandFolders( pathList, filters = None, logger = None, level = None,
+                   useGenerator = False, workers = None, useCache = False ):
   """
     Expand all folders to the contained files using the filters on pathList
 
@@ -349,12 +1617,18 @@ def expandFolders( pathList, filters = None, logger = None, level = None):
     -> pathList: a list containing paths to files and folders;
     filters;
     -> filters: return a list for each filter with the files contained on the
-    list matching the filter glob.
+    list matching the filter glob. The filters are matched against the file
+    names, and files starting with a dot are only matched by filters starting
+    with a dot;
     -> logger: whether to print progress using logger;
     -> level: logging level to print messages with logger;
-
-    WARNING: This function is extremely slow and will severely decrease
-    performance if used to expand base paths with several folders in it.
+    -> useGenerator: return a generator yielding each file as soon as it is
+    found. When using multiple filters, it yields (filterIdx, filePath) pairs;
+    -> workers: the number of threads used to walk the subfolders of each
+    folder in parallel, which mostly improves listing network file systems;
+    -> useCache: reuse the folder listings cached by previous calls, only
+    listing again the folders modified since then. Set it to True to use the
+    cache shared by this process, or to a ListingCache instance.
   """
   if not isinstance( pathList, (list,tuple,) ):
     pathList = [pathList]
@@ -363,31 +1637,29 @@ def expandFolders( pathList, filters = None, logger = None, level = None):
     filters = ['*']
   if not( type( filters ) in (list,tuple,) ):
     filters = [ filters ]
-  retList = [[] for idx in range(len(filters))]
   from RingerCore import progressbar, traverse
   pathList = list(traverse([glob(path) if '*' in path else path for path in traverse(pathList,simple_ret=True)],simple_ret=True))
-  for path in progressbar( pathList, len(pathList), 'Expanding folders: ', 60, 50,
-                           True if logger is not None else False, logger = logger,
-                           level = level):
-    path = expandPath( path )
-    if not os.path.exists( path ):
-      raise ValueError("Cannot reach path '%s'" % path )
-    if os.path.isdir(path):
-      for idx, filt in enumerate(filters):
-        cList = filter(lambda x: not(os.path.isdir(x)), [ f for f in glob( os.path.join(path,filt) ) ])
-        if cList:
-          retList[idx].extend(cList)
-      folders = [ os.path.join(path,f) for f in os.listdir( path ) if os.path.isdir( os.path.join(path,f) ) ]
-      if folders:
-        recList = expandFolders( folders, filters )
-        if len(filters) is 1:
-          recList = [recList]
-        for l in recList:
-          retList[idx].extend(l)
-    else:
-      for idx, filt in enumerate(filters):
-        if path in glob( os.path.join( os.path.dirname( path ) , filt ) ):
-          retList[idx].append( path )
+  pathList = progressbar( pathList, len(pathList), 'Expanding folders: ', 60, 50,
+                          True if logger is not None else False, logger = logger,
+                          level = level)
+  matchers = __compile_filters( filters )
+  listDir = __listing_function( useCache )
+  def walk():
+    pool = None
+    if workers is not None and workers > 1:
+      from multiprocessing.pool import ThreadPool
+      pool = ThreadPool( workers )
+    try:
+      for item in __expand_folders( pathList, matchers, pool, listDir ):
+        yield item
+    finally:
+      if pool is not None:
+        pool.terminate()
+  if useGenerator:
+    return ( path for _, path in walk() ) if len(filters) == 1 else walk()
+  retList = [[] for idx in range(len(filters))]
+  for idx, path in walk():
+    retList[idx].append( path )
   if len(filters) is 1:
     retList = retList[0]
   return retList
@@ -416,11 +1688,24 @@ def checkExtension( filename, ext, ignoreNumbersAfterExtension = True):
   """
   return bool(__extRE(ext, ignoreNumbersAfterExtension).match( filename ))
 
+def checkExtension_many( filenames, ext, ignoreNumbersAfterExtension = True):
+  """
+    Same as checkExtension, but returning a list with the result for each one
+    of the filenames.
+  """
+  match = __extRE(ext, ignoreNumbersAfterExtension).match
+  return [ match( filename ) is not None for filename in filenames ]
+
 def __extRE(ext, ignoreNumbersAfterExtension = True):
   """
   Returns a regular expression compiled object that will search for
   extension ext
   """
+  if isinstance( ext, list ): ext = tuple( ext )
+  return __compile_ext_re( ext, bool(ignoreNumbersAfterExtension) )
+
+@lru_cache(maxsize = 1024)
+def __compile_ext_re(ext, ignoreNumbersAfterExtension):
   import re
   if not isinstance( ext, (list,tuple,)): ext = ext.split('|')
   ext = [e[1:] if e[0] == '.' else e for e in ext]
@@ -445,8 +1730,7 @@ def ensureExtension( filename, extL, ignoreNumbersAfterExtension = True ):
     extL = [extL]
   extL = ['.' + e if e[0] != '.' else e for e in extL]
 
-  # FIXME: This can be returned earlier by using filter
-  if any([checkExtension(filename, ext, ignoreNumbersAfterExtension) for ext in extL]):
+  if checkExtension(filename, tuple(extL), ignoreNumbersAfterExtension):
     return filename
 
   # FIXME We should check every extension and see how many composed matches we had before doing this
@@ -466,9 +1750,9 @@ def ensureExtension( filename, extL, ignoreNumbersAfterExtension = True ):
   return filename
 
 def changeExtension( filename, newExtension, knownFileExtensions = ['tgz', 'tar.gz', 'tar.xz','tar',
-                                                                    'pic.gz', 'pic.xz', 'pic',
+                                                                    'pic.gz', 'pic.xz', 'pic.bz2', 'pic.zst', 'pic.lz4', 'pic',
                                                                     'npz', 'npy', 'root'],
-                      retryExtensions = ['gz', 'xz'],
+                      retryExtensions = ['gz', 'xz', 'bz2', 'zst', 'lz4'],
                       moreFileExtensions = [],
                       moreRetryExtensions = [],
                       ignoreNumbersAfterExtension = True,
@@ -491,14 +1775,13 @@ def changeExtension( filename, newExtension, knownFileExtensions = ['tgz', 'tar.
   Output:
     -> the filename with the string appended.
   """
-  knownFileExtensions.extend( moreFileExtensions )
   def repStr( newExt ):
     return r'\g<1>' + ( newExt if newExt.startswith('.') else ( '.' + newExt ) )
-  str_ = __extRE( knownFileExtensions )
+  str_ = __extRE( tuple(knownFileExtensions) + tuple(moreFileExtensions), ignoreNumbersAfterExtension )
   m = str_.match( filename )
   if m:
     return str_.sub( repStr(newExtension), filename )
-  str_ = __extRE( retryExtensions )
+  str_ = __extRE( tuple(retryExtensions) + tuple(moreRetryExtensions), ignoreNumbersAfterExtension )
   m = str_.match( filename )
   if m:
     return str_.sub( repStr(newExtension), filename )
@@ -506,9 +1789,9 @@ def changeExtension( filename, newExtension, knownFileExtensions = ['tgz', 'tar.
     return filename + newExtension
 
 def prependAppendToFileName( filename, prependStr, appendStr, knownFileExtensions = ['tgz', 'tar.gz', 'tar.xz','tar',
-                                                                                     'pic.gz', 'pic.xz', 'pic',
+                                                                                     'pic.gz', 'pic.xz', 'pic.bz2', 'pic.zst', 'pic.lz4', 'pic',
                                                                                      'npz', 'npy', 'root','pdf','jpg','jpeg'],
-                      retryExtensions = ['gz', 'xz'],
+                      retryExtensions = ['gz', 'xz', 'bz2', 'zst', 'lz4'],
                       moreFileExtensions = [],
                       moreRetryExtensions = [],
                       ignoreNumbersAfterExtension = True,
@@ -530,9 +1813,9 @@ def prependToFileName( prependStr, filename, separator = '_'):
   return os.path.dirname(filename) + prependStr + separator + os.path.basename(filename)
 
 def appendToFileName( filename, appendStr, knownFileExtensions = ['tgz', 'tar.gz', 'tar.xz','tar',
-                                                                  'pic.gz', 'pic.xz', 'pic',
+                                                                  'pic.gz', 'pic.xz', 'pic.bz2', 'pic.zst', 'pic.lz4', 'pic',
                                                                   'npz', 'npy', 'root','pdf','jpg','jpeg'],
-                      retryExtensions = ['gz', 'xz'],
+                      retryExtensions = ['gz', 'xz', 'bz2', 'zst', 'lz4'],
                       moreFileExtensions = [],
                       moreRetryExtensions = [],
                       ignoreNumbersAfterExtension = True,
@@ -556,17 +1839,16 @@ def appendToFileName( filename, appendStr, knownFileExtensions = ['tgz', 'tar.gz
   Output:
     -> the filename with the string appended.
   """
-  knownFileExtensions.extend( moreFileExtensions )
   def repStr( lSep ):
     return r'\g<1>' + lSep + appendStr + r'.\g<2>' + r'\g<3>'
-  str_ = __extRE(knownFileExtensions)
+  str_ = __extRE(tuple(knownFileExtensions) + tuple(moreFileExtensions), ignoreNumbersAfterExtension)
   m = str_.match(filename)
   if m:
     lSep = ''
     if not(m.group(1).endswith(separator) or appendStr.startswith(separator)):
       lSep = separator
     return str_.sub(repStr(lSep), filename)
-  str_ = __extRE(retryExtensions)
+  str_ = __extRE(tuple(retryExtensions) + tuple(moreRetryExtensions), ignoreNumbersAfterExtension)
   m = str_.match(filename)
   if m:
     lSep = ''
@@ -576,19 +1858,106 @@ def appendToFileName( filename, appendStr, knownFileExtensions = ['tgz', 'tar.gz
   else:
     return filename + ( separator if not(filename.endswith(separator) or appendStr.startswith(separator)) else '') + appendStr
 
-def getMD5(filepath):
+class _Adler32( object ):
   """
-  Get files md5 hash
+  hashlib like interface to zlib.adler32, the checksum used by rucio.
   """
-  import os.path
+  name = 'adler32'
+
+  def __init__(self):
+    self._value = 1
+
+  def update(self, data):
+    import zlib
+    self._value = zlib.adler32( data, self._value )
+
+  def hexdigest(self):
+    return '%08x' % ( self._value & 0xffffffff )
+
+def __new_hasher( algorithm ):
+  if algorithm == 'adler32':
+    return _Adler32()
   import hashlib
-  md5_returned = ''
-  with open(os.path.expandvars(filepath),'rb') as file_to_check:
-    # read contents of the file
-    data = file_to_check.read()
-    # pipe contents of the file through
-    md5_returned = hashlib.md5(data).hexdigest()
-  return md5_returned
+  return hashlib.new( algorithm )
+
+# Digests computed by getHashes, keyed by (path, size, mtime)
+_hashCache = {}
+
+def getHashes(filepath, algorithms = ('md5',), bufferSize = 1 << 20, useCache = False):
+  """
+  Get the file digests, reading the file only once.
+
+  -> algorithms: the algorithm names, any hashlib algorithm or adler32;
+  -> bufferSize: the number of bytes read at a time;
+  -> useCache: reuse the digests computed previously by this process while
+  the file size and modification time are unchanged.
+
+  Returns a dict with the hexadecimal digest of each algorithm.
+  """
+  if isinstance( algorithms, basestring ):
+    algorithms = [algorithms]
+  filepath = os.path.abspath( os.path.expandvars( filepath ) )
+  if useCache:
+    st = os.stat( filepath )
+    key = ( filepath, st.st_size, st.st_mtime )
+    cached = _hashCache.get( key, {} )
+    missing = [ alg for alg in algorithms if alg not in cached ]
+    if missing:
+      cached = dict( cached, **getHashes( filepath, missing, bufferSize ) )
+      _hashCache[key] = cached
+    return dict( (alg, cached[alg]) for alg in algorithms )
+  hashers = [ __new_hasher( alg ) for alg in algorithms ]
+  with open( filepath, 'rb' ) as f:
+    for data in iter( lambda: f.read( bufferSize ), '' ):
+      for hasher in hashers:
+        hasher.update( data )
+  return dict( (alg, hasher.hexdigest()) for alg, hasher in zip( algorithms, hashers ) )
+
+def _hash_many_worker( args ):
+  """
+  Internal method used by hash_many to hash a file on the thread pool
+  """
+  filepath, algorithms, bufferSize, useCache = args
+  return filepath, getHashes( filepath, algorithms, bufferSize, useCache )
+
+def hash_many(paths, algorithms = ('md5',), workers = None, bufferSize = 1 << 20,
+              useCache = False, logger = None, level = None):
+  """
+    Get the digests of several files using a thread pool (see getHashes).
+
+    -> paths: the files to hash;
+    -> workers: the number of threads. When not specified, OMP_NUM_THREADS is
+    used;
+    -> logger: whether to print progress using logger;
+    -> level: logging level to print messages with logger.
+
+    Returns a dict mapping each path to its digests.
+  """
+  from multiprocessing.pool import ThreadPool
+  from RingerCore.util import progressbar
+  if isinstance( paths, basestring ):
+    paths = [paths]
+  if not paths:
+    return {}
+  if workers is None:
+    from RingerCore.Configure import OMP_NUM_THREADS
+    workers = OMP_NUM_THREADS
+  workers = max( min( workers, len(paths) ), 1 )
+  pool = ThreadPool( workers )
+  try:
+    results = pool.imap_unordered( _hash_many_worker,
+                                   [ (path, algorithms, bufferSize, useCache) for path in paths ] )
+    return dict( progressbar( results, len(paths), 'Hashing files: ', 60, 1,
+                              True if logger is not None else False, logger = logger,
+                              level = level ) )
+  finally:
+    pool.terminate()
+
+def getMD5(filepath, bufferSize = 1 << 20):
+  """
+  Get files md5 hash
+  """
+  return getHashes( filepath, ('md5',), bufferSize )['md5']
 
 def checkFile(filepath, md5sum = None):
   """
@@ -611,36 +1980,196 @@ class WriteMethod( EnumStringification ):
   Readlines = 0
   Read = 1
   ShUtil = 2
+  Kernel = 3
+  Parallel = 4
+
+# Maximum number of bytes copied at once by the Kernel and Parallel methods
+_catChunkSize = 64 << 20
+# Errors meaning that the kernel copy is not supported for these files
+_kernelCopyUnsupported = ( errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF )
+# The libc used for the kernel copies, which are not available on the python 2
+# os module. It is loaded on the first use and set to False if not available
+_libc = None
+
+def __load_libc():
+  """
+  Returns the libc with the prototypes of copy_file_range, sendfile and
+  posix_fallocate set for the ones it provides, or False if it cannot be
+  loaded.
+  """
+  global _libc
+  if _libc is None:
+    import ctypes, ctypes.util
+    try:
+      libc = ctypes.CDLL( ctypes.util.find_library('c') or 'libc.so.6', use_errno = True )
+    except OSError:
+      libc = False
+    if libc:
+      pOffset = ctypes.POINTER( ctypes.c_int64 )
+      for name, restype, argtypes in (
+          ( 'copy_file_range',   ctypes.c_ssize_t, [ctypes.c_int, pOffset, ctypes.c_int, pOffset, ctypes.c_size_t, ctypes.c_uint] ),
+          ( 'sendfile64',        ctypes.c_ssize_t, [ctypes.c_int, ctypes.c_int, pOffset, ctypes.c_size_t] ),
+          ( 'posix_fallocate64', ctypes.c_int,     [ctypes.c_int, ctypes.c_int64, ctypes.c_int64] ), ):
+        if hasattr( libc, name ):
+          fcn = getattr( libc, name )
+          fcn.restype, fcn.argtypes = restype, argtypes
+    _libc = libc
+  return _libc
+
+def __kernel_copy( fcn, *args ):
+  """
+  Call the libc copy function fcn, raising OSError when it fails. Returns the
+  number of bytes copied.
+  """
+  import ctypes
+  n = fcn( *args )
+  if n < 0:
+    err = ctypes.get_errno()
+    raise OSError( err, os.strerror( err ) )
+  return n
+
+def __preallocate( fd, size ):
+  """
+  Allocate size bytes for file descriptor fd
+  """
+  libc = __load_libc()
+  if libc and hasattr( libc, 'posix_fallocate64' ) and size:
+    err = libc.posix_fallocate64( fd, 0, size )
+    if err and err not in ( errno.EOPNOTSUPP, errno.EINVAL ):
+      raise OSError( err, os.strerror( err ) )
+  os.ftruncate( fd, size )
+
+def __copy_into( fname, outFd, offset ):
+  """
+  Copy fname contents into file descriptor outFd starting at offset. The copy
+  is done by the kernel (copy_file_range or sendfile, called through ctypes)
+  when available, otherwise large chunks are copied. outFd position is
+  changed.
+  """
+  import ctypes
+  libc = __load_libc()
+  inFd = os.open( fname, os.O_RDONLY )
+  try:
+    size = os.fstat( inFd ).st_size
+    copied = 0
+    if libc and hasattr( libc, 'copy_file_range' ):
+      inOffset, outOffset = ctypes.c_int64( 0 ), ctypes.c_int64( offset )
+      try:
+        while copied < size:
+          n = __kernel_copy( libc.copy_file_range, inFd, ctypes.byref( inOffset ), outFd,
+                             ctypes.byref( outOffset ), min( size - copied, _catChunkSize ), 0 )
+          if not n: break
+          copied += n
+      except OSError, e:
+        if e.errno not in _kernelCopyUnsupported:
+          raise
+    if copied < size and libc and hasattr( libc, 'sendfile64' ):
+      os.lseek( outFd, offset + copied, os.SEEK_SET )
+      inOffset = ctypes.c_int64( copied )
+      try:
+        while copied < size:
+          n = __kernel_copy( libc.sendfile64, outFd, inFd, ctypes.byref( inOffset ),
+                             min( size - copied, _catChunkSize ) )
+          if not n: break
+          copied += n
+      except OSError, e:
+        if e.errno not in _kernelCopyUnsupported:
+          raise
+    if copied < size:
+      os.lseek( inFd, copied, os.SEEK_SET )
+      os.lseek( outFd, offset + copied, os.SEEK_SET )
+      while copied < size:
+        data = os.read( inFd, min( size - copied, _catChunkSize ) )
+        if not data: break
+        copied += len(data)
+        while data:
+          data = data[os.write( outFd, data ):]
+    if copied != size:
+      raise IOError("Could only copy %d out of %d bytes from %s." % (copied, size, fname))
+  finally:
+    os.close( inFd )
+
+def _cat_files_worker( args ):
+  """
+  Internal method used by cat_files_py to copy a file on the thread pool
+  """
+  fname, ofile, offset = args
+  outFd = os.open( ofile, os.O_WRONLY )
+  try:
+    __copy_into( fname, outFd, offset )
+  finally:
+    os.close( outFd )
 
 
 #@timed
-def cat_files_py(flist, ofile, op, logger = None, level = None):
+def cat_files_py(flist, ofile, op, logger = None, level = None, createIndex = False, workers = None):
   """
     cat files using python.
 
+    The WriteMethod.Kernel method preallocates ofile and copies each file using
+    the kernel copies (copy_file_range/sendfile, called from libc through
+    ctypes) when they are available, otherwise copying large chunks. WriteMethod.Parallel does the same, but
+    copying the files to their (disjoint) output offsets concurrently using
+    workers threads (OMP_NUM_THREADS when not specified).
+
+    When createIndex is set, the sidecar tarball index (see createTarIndex) is
+    also created for ofile. The inputs indexes are reused when all of them are
+    available, otherwise ofile is scanned.
+
     taken from: https://gist.github.com/dimo414/2993381
   """
   op = WriteMethod.retrieve( op )
   if not isinstance(flist, (list, tuple)):
     flist = [flist]
   from RingerCore.Logger import LoggingLevel
+  from RingerCore.util import progressbar
   if level is None: level = LoggingLevel.INFO
-  with open(ofile, 'wb') as out:
-    from RingerCore.util import progressbar
-    for fname in progressbar(flist, len(flist), prefix="Merging: ",
-                             disp = True if logger is not None else False, step = 10,
-                             logger = logger, level = level ):
-      with open(fname,'rb') as f:
-        if op is WriteMethod.Readlines:
-          out.writelines(f.readlines())
-        elif op is WriteMethod.Read:
-          out.write(f.read())
-        elif op is WriteMethod.ShUtil:
-          import shutil
-          shutil.copyfileobj(f, out)
-      # end of with open(fname)
-    # end of for fname in progressbar
-  # end of with open(ofile)
+  if op in (WriteMethod.Kernel, WriteMethod.Parallel):
+    offsets = [0]
+    for fname in flist:
+      offsets.append( offsets[-1] + os.path.getsize( fname ) )
+    outFd = os.open( ofile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666 )
+    try:
+      __preallocate( outFd, offsets[-1] )
+      if op is WriteMethod.Kernel:
+        for fname, offset in progressbar(zip(flist, offsets), len(flist), prefix="Merging: ",
+                                         disp = True if logger is not None else False, step = 10,
+                                         logger = logger, level = level ):
+          __copy_into( fname, outFd, offset )
+      else:
+        from multiprocessing.pool import ThreadPool
+        if workers is None:
+          from RingerCore.Configure import OMP_NUM_THREADS
+          workers = OMP_NUM_THREADS
+        pool = ThreadPool( max( min( workers, len(flist) ), 1 ) )
+        try:
+          for _ in progressbar(pool.imap_unordered( _cat_files_worker, [ (fname, ofile, offset) for fname, offset in zip(flist, offsets) ] ),
+                               len(flist), prefix="Merging: ",
+                               disp = True if logger is not None else False, step = 10,
+                               logger = logger, level = level ):
+            pass
+        finally:
+          pool.terminate()
+    finally:
+      os.close( outFd )
+  else:
+    with open(ofile, 'wb') as out:
+      for fname in progressbar(flist, len(flist), prefix="Merging: ",
+                               disp = True if logger is not None else False, step = 10,
+                               logger = logger, level = level ):
+        with open(fname,'rb') as f:
+          if op is WriteMethod.Readlines:
+            out.writelines(f.readlines())
+          elif op is WriteMethod.Read:
+            out.write(f.read())
+          elif op is WriteMethod.ShUtil:
+            import shutil
+            shutil.copyfileobj(f, out)
+        # end of with open(fname)
+      # end of for fname in progressbar
+    # end of with open(ofile)
+  if createIndex and not __merge_tar_indexes( flist, ofile ):
+    createTarIndex( ofile )
 
 def findFile( filename, pathlist, access ):
   """
@@ -674,12 +2203,22 @@ def mkdir_p(path):
       pass
     else: raise IOError
 
-def getFiles(folder, ftype = os.path.isfile, fullpath = True):
+def getFiles(folder, ftype = os.path.isfile, fullpath = True, useCache = False):
   """
   As in expand folders, but without recursion
   """
+  if useCache:
+    listing = sorted( __listing_function( useCache )( folder ) )
+    if ftype is os.path.isdir:
+      files = [ f for f, isDir, _, _ in listing if isDir ]
+    elif ftype is os.path.isfile:
+      files = [ f for f, _, _, isFile in listing if isFile ]
+    else:
+      files = [ f for f, _, _, _ in listing if ftype( os.path.join(folder,f) ) ]
+  else:
+    files = [ f for f in sorted(os.listdir(folder)) if ftype( os.path.join(folder,f) ) ]
   if fullpath:
-    return [ os.path.join(folder,f) for f in sorted(os.listdir(folder)) if ftype( os.path.join(folder,f) ) ]
+    return [ os.path.join(folder,f) for f in files ]
   else:
-    return [ f for f in sorted(os.listdir(folder)) if ftype( os.path.join(folder,f) ) ]
+    return files
 
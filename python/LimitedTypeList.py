@@ -1,9 +1,13 @@
 __all__ = ['LimitedTypeList', 'LimitedTypeStreamableList', 'NotAllowedType',
            'LimitedTypeListRDC', 'LimitedTypeListRDS', 'LoggerLimitedTypeListRDS',
-           'inspect_list_attrs']
+           'LimitedTypeArrayList', 'LimitedTypeStreamableArrayList',
+           'LimitedTypeArrayListRDS', 'LimitedTypeArrayListRDC',
+           'LoggerLimitedTypeArrayListRDS', 'inspect_list_attrs']
 
 import re
+import numpy as np
 _lMethodSearch=re.compile("_LimitedTypeList__(\S+)")
+_lArrayMethodSearch=re.compile("_LimitedTypeArrayList__(\S+)")
 
 class LimitedTypeList (type):
   """
@@ -27,20 +31,7 @@ class LimitedTypeList (type):
   # TODO Add boolean to flag if the class can hold itself
 
   def __new__(cls, name, bases, dct):
-    if not any( [ issubclass(base, list) for base in bases ] ):
-      bases = (list,) + bases 
-    import inspect
-    import sys
-    hasBaseInit = any([hasattr(base,'__init__') for base in bases if base.__name__ not in 
-                                                                    ("list", "object", "Logger", "LoggerStreamable",)])
-    for localFcnName, fcn in inspect.getmembers( sys.modules[__name__], inspect.isfunction):
-      m = _lMethodSearch.match(localFcnName)
-      if m:
-        fcnName = m.group(1)
-        if not fcnName in dct:
-          if hasBaseInit and fcnName == '__init__' and not dct.get('_useLimitedTypeList__init__', False):
-            continue
-          dct[fcnName] = fcn
+    bases = _prepareLimitedTypeList( bases, dct )
     return type.__new__(cls, name, bases, dct)
 
   def __init__(cls, name, bases, dct):
@@ -62,6 +53,33 @@ class LimitedTypeList (type):
   def __call__(cls, *args, **kw):
     return type.__call__(cls, *args, **kw)
 
+# The concrete types known to be accepted by each _acceptedTypes tuple
+_acceptedConcreteTypes = {}
+
+def _checkAllowedTypes( obj, values ):
+  """
+  Raise NotAllowedType if any of the values is not an instance from the
+  obj._acceptedTypes. The concrete types already accepted are checked with a
+  single set operation, the remaining values are checked using isinstance.
+  """
+  acceptedTypes = obj._acceptedTypes
+  try:
+    known = _acceptedConcreteTypes[acceptedTypes]
+  except KeyError:
+    known = _acceptedConcreteTypes.setdefault( acceptedTypes, set() )
+  types = set( map( type, values ) )
+  if types <= known:
+    return
+  for vType in types - known:
+    if issubclass( vType, acceptedTypes ):
+      known.add( vType )
+  if types <= known:
+    return
+  # Instances whose class cannot be cached, e.g. old style classes
+  for value in values:
+    if not type(value) in known and not isinstance(value, acceptedTypes):
+      raise NotAllowedType( obj, value, acceptedTypes )
+
 
 def _LimitedTypeList__setitem(self, k, var):
   """
@@ -70,7 +88,7 @@ def _LimitedTypeList__setitem(self, k, var):
   # This is default overload for list setitem, checking if item is accepted
   if not isinstance(var, self._acceptedTypes):
     raise NotAllowedType(self, var, self._acceptedTypes)
-  list.setitem(self, k, var)
+  list.__setitem__(self, k, var)
 
 def _LimitedTypeList__append(self, var):
   """
@@ -93,11 +111,12 @@ def _LimitedTypeList__append(self, var):
 #
 def _LimitedTypeList__extend(self, var):
   """
-    Default append method
+    Default extend method
   """
-  # This is default overload for list append, checking if item is accepted
-  if not isinstance(var, self._acceptedTypes):
-    raise NotAllowedType( self, var, self._acceptedTypes)
+  # This is default overload for list extend, checking if items are accepted
+  if not type(var) in (list, tuple, type(self)):
+    var = list(var)
+  _checkAllowedTypes( self, var )
   list.extend(self,var)
 
 def _LimitedTypeList____add__(self, var):
@@ -105,9 +124,7 @@ def _LimitedTypeList____add__(self, var):
     Default __add__ method
   """
   if type(var) in (list, tuple, type(self)):
-    for value in var:
-      if not isinstance(value, self._acceptedTypes):
-        raise NotAllowedType( self, value, self._acceptedTypes )
+    _checkAllowedTypes( self, var )
   else:
     if not isinstance(var, self._acceptedTypes):
       raise NotAllowedType( self, var, self._acceptedTypes)
@@ -137,13 +154,10 @@ def _LimitedTypeList____iadd__( self, var, *args ):
 #    print ":: adding ", repr(var), " to TexObjectContextManager ::"
 #    import traceback
 #    print "STACK:", ''.join(traceback.format_stack())
-  for arg in args:
-    if not isinstance( arg, self._acceptedTypes ):
-      raise NotAllowedType( self, arg, self._acceptedTypes )
+  if args:
+    _checkAllowedTypes( self, args )
   if type(var) in (list, tuple, type(self)):
-    for value in var:
-      if not isinstance( value, self._acceptedTypes ):
-        raise NotAllowedType( self, value, self._acceptedTypes )
+    _checkAllowedTypes( self, var )
   else:
     if not isinstance(var, self._acceptedTypes):
       raise NotAllowedType( self, var, self._acceptedTypes)
@@ -181,17 +195,93 @@ class NotAllowedType(ValueError):
 
 from RingerCore.RawDictStreamable import ( RawDictStreamable, RawDictStreamer
                                          , RawDictCnv, LoggerRawDictStreamer
-                                         , checkAttrOrSetDefault )
+                                         , checkAttrOrSetDefault, isRawDictFormat
+                                         , _prepareRawDictStreamable, _searchMethods )
+
+# Types whose values are stored on columns and retrieved as python values
+_columnarPythonScalars = (bool, int, float)
+
+def _isColumnar( items ):
+  """
+  Returns whether the raw list items are on the columnar encoding.
+  """
+  return type(items) is dict and '__columnar' in items
+
+def _columnarEncode( items ):
+  """
+  Returns the columnar encoding of the raw dictionaries on items, or None when
+  they are not instances of the same class holding the same attributes.
+
+  The encoding holds the class information once and each attribute on a
+  column. Attributes holding python or numpy scalars of the same type are
+  stored on numpy arrays, as well as numpy arrays of the same shape and dtype,
+  which are stacked (except for zero-dimensional arrays, which would be
+  decoded as scalars). Other attributes are stored on lists.
+  """
+  import numpy as np
+  if not items or not all( isRawDictFormat( item ) for item in items ):
+    return None
+  header = { attr : items[0][attr] for attr in RawDictCnv.baseAttrs }
+  keys = items[0].viewkeys()
+  for item in items:
+    if item.viewkeys() != keys or any( item[attr] != val for attr, val in header.iteritems() ):
+      return None
+  columns = {}
+  pythonScalars = []
+  for key in keys - RawDictCnv.baseAttrs:
+    values = [ item[key] for item in items ]
+    vType = type(values[0])
+    if not all( type(val) is vType for val in values ):
+      columns[key] = values
+    elif vType in _columnarPythonScalars:
+      columns[key] = np.array( values, dtype = vType )
+      pythonScalars.append( key )
+    elif issubclass( vType, (np.number, np.bool_) ):
+      columns[key] = np.array( values, dtype = vType )
+    elif vType is np.ndarray and values[0].ndim and values[0].dtype != object and \
+        all( val.dtype == values[0].dtype and val.shape == values[0].shape for val in values ):
+      columns[key] = np.stack( values )
+    else:
+      columns[key] = values
+  return { '__columnar' : 1
+         , 'header' : header
+         , 'size' : len(items)
+         , 'columns' : columns
+         , 'pythonScalars' : pythonScalars }
+
+def _columnarDecode( items ):
+  """
+  Returns the raw dictionaries encoded by _columnarEncode.
+  """
+  header = items['header']
+  ret = [ dict( header ) for _ in xrange( items['size'] ) ]
+  pythonScalars = set( items['pythonScalars'] )
+  for key, column in items['columns'].iteritems():
+    if key in pythonScalars:
+      column = column.tolist()
+    for item, val in zip( ret, column ):
+      item[key] = val
+  return ret
 
 class LimitedTypeListRDS( RawDictStreamer ):
   """
   This is the default streamer class for limited type lists. Overload this
   method to deal with special cases.
+
+  When columnar is set, lists holding instances of the same class are streamed
+  on a columnar encoding: the class information is stored once and each
+  attribute on a column, numpy arrays whenever possible.
   """
 
   # FIXME: items should be __items. How to treat __items so that matlab can
   # read it as well?
 
+  columnar = False
+
+  def __init__(self, transientAttrs = set(), toPublicAttrs = set(), columnar = False, **kw):
+    RawDictStreamer.__init__(self, transientAttrs, toPublicAttrs, **kw)
+    self.columnar = columnar
+
   def __call__(self, obj):
     "Return a raw dict object from itself"
     setattr(obj,'items', list(obj))
@@ -204,11 +294,13 @@ class LimitedTypeListRDS( RawDictStreamer ):
 
   def treatDict(self, obj, raw):
     listItems = raw['items']
-    from TuningTools.PreProc import PreProcCollection
-    tObj = type(obj)
     for idx, cObj in enumerate(listItems):
       if hasattr( cObj, 'toRawObj' ):
         listItems[idx] = cObj.toRawObj()
+    if self.columnar:
+      columns = _columnarEncode( listItems )
+      if columns is not None:
+        raw['items'] = columns
     RawDictStreamer.treatDict( self, obj, raw )
     return raw
 
@@ -224,6 +316,15 @@ class LimitedTypeListRDC( RawDictCnv ):
     ignoreAttrs = set(ignoreAttrs) | LimitedTypeListRDC.ignoreAttrs
     RawDictCnv.__init__( self, ignoreAttrs, toProtectedAttrs, **kw )
 
+  def preCall( self, obj, d ):
+    """
+    Decode the items streamed on the columnar encoding.
+    """
+    if _isColumnar( d['items'] ):
+      d = dict( d )
+      d['items'] = _columnarDecode( d['items'] )
+    return obj, d
+
   def treatObj( self, obj, d ):
     """
     Overload this method to treat the python object
@@ -233,10 +334,20 @@ class LimitedTypeListRDC( RawDictCnv ):
       obj.append( retrieveRawDict( rawObj ) )
     return obj
 
+  def rawChildren( self, d ):
+    """
+    Returns the raw dictionaries on d, including the list items.
+    """
+    children = RawDictCnv.rawChildren( self, d )
+    if not _isColumnar( d['items'] ):
+      children += [ rawObj for rawObj in d['items'] if isRawDictFormat( rawObj ) ]
+    return children
+
 class LoggerLimitedTypeListRDS( LoggerRawDictStreamer, LimitedTypeListRDS ):
   # FIXME This should be a collection of RDCs to be applied
-  def __init__(self, transientAttrs = set(), toPublicAttrs = set(), **kw):
+  def __init__(self, transientAttrs = set(), toPublicAttrs = set(), columnar = False, **kw):
     LoggerRawDictStreamer.__init__(self, transientAttrs, toPublicAttrs, **kw)
+    self.columnar = columnar
 
   def __call__(self, obj):
     return LimitedTypeListRDS.__call__( self, obj )
@@ -257,11 +368,361 @@ class LimitedTypeStreamableList( RawDictStreamable, LimitedTypeList):
     else:
       checkAttrOrSetDefault( "_streamerObj", dct, bases, LimitedTypeListRDS )
     checkAttrOrSetDefault( "_cnvObj", dct, bases, LimitedTypeListRDC )
-    t1 = RawDictStreamable.__new__(cls, name, bases, dct)
-    name = t1.__name__
-    bases = tuple(t1.mro())
-    dct = t1.__dict__.copy()
-    return LimitedTypeList.__new__(cls, name, bases, dct)
+    _prepareRawDictStreamable( bases, dct )
+    # The streamable lists use the list __init__ unless
+    # _useLimitedTypeList__init__ is set.
+    bases = _prepareLimitedTypeList( bases, dct, hasBaseInit = True )
+    return type.__new__(cls, name, bases, dct)
+
+# The buffer dtypes used for python and abstract numpy accepted types
+_arrayListDtypes = { bool : np.bool_, int : np.int_, long : np.int_, float : np.float_
+                   , np.integer : np.int_, np.signedinteger : np.int_
+                   , np.floating : np.float_, np.number : np.float_ }
+
+class LimitedTypeArrayList( LimitedTypeList ):
+  """
+    LimitedTypeArrayList metaclass creates lists of numeric scalars which,
+    as the LimitedTypeList, only accept the _acceptedTypes instances. The
+    elements are stored on a numpy buffer, whose capacity is doubled when it
+    needs to grow, instead of python objects.
+
+    The buffer dtype can be declared using the _dtype property, otherwise it
+    is determined from the _acceptedTypes. Since all elements are stored with
+    the same dtype, _acceptedTypes of different kinds (e.g. int and float)
+    require declaring _dtype, to which the elements are converted. When all
+    _acceptedTypes are python types, the elements are retrieved as python
+    scalars, otherwise they are retrieved as numpy scalars. Numpy arrays are
+    accepted when their scalar type is one of the _acceptedTypes or their
+    dtype is the buffer dtype.
+
+    The elements are available without copying them as a numpy array through
+    the array property or numpy.asarray. These arrays share the buffer memory
+    until it is reallocated to grow. The list interface is also available,
+    with slices returned as lists of the same class.
+  """
+
+  def __new__(cls, name, bases, dct):
+    _prepareLimitedTypeArrayList( bases, dct )
+    return type.__new__(cls, name, bases, dct)
+
+  def __init__(cls, name, bases, dct):
+    LimitedTypeList.__init__(cls, name, bases, dct)
+    if '_dtype' in dct:
+      dtype = np.dtype( dct['_dtype'] )
+    else:
+      dtypes = [ np.dtype( _arrayListDtypes.get( t, t ) ) for t in cls._acceptedTypes ]
+      if len( set( dt.kind for dt in dtypes ) ) > 1:
+        raise ValueError("%s accepts types of different kinds (%s), which would be converted to a single dtype. "
+                         "Declare _dtype to choose it." % (name, ', '.join( t.__name__ for t in cls._acceptedTypes ) ) )
+      dtype = np.result_type( *dtypes )
+    if not ( np.issubdtype( dtype, np.number ) or dtype == np.bool_ ):
+      raise ValueError("LimitedTypeArrayList can only hold numeric types (dtype is %s)." % dtype)
+    cls._dtype = dtype
+    cls._pythonScalars = all( t in (bool, int, long, float) for t in cls._acceptedTypes )
+    # Empty buffer shared by the empty lists, it is replaced by the first
+    # element insertion.
+    cls._buffer = np.empty( 0, dtype = dtype )
+    cls._size = 0
+
+def _arrayListView( obj ):
+  """
+  Returns the array list elements as a numpy array sharing its buffer.
+  """
+  return obj._buffer[:obj._size]
+
+def _arrayListReserve( obj, size ):
+  """
+  Make sure that the array list buffer can hold size elements, at least
+  doubling its capacity when it needs to grow.
+  """
+  capacity = len(obj._buffer)
+  if size > capacity:
+    buf = np.empty( max( size, 2 * capacity, 8 ), dtype = obj._dtype )
+    buf[:obj._size] = obj._buffer[:obj._size]
+    obj._buffer = buf
+
+def _arrayListValues( obj, var ):
+  """
+  Returns the values on var after checking that they are accepted by obj.
+  """
+  if isinstance( type(var), LimitedTypeArrayList ):
+    var = var.array
+  if isinstance( var, np.ndarray ):
+    # All elements have the same type
+    if var.ndim != 1:
+      raise ValueError("Cannot add a %d-dimensional array to %s." % (var.ndim, obj.__class__.__name__))
+    if len(var) and not( var.dtype == obj._dtype or issubclass( var.dtype.type, obj._acceptedTypes ) ):
+      raise NotAllowedType( obj, var[0], obj._acceptedTypes )
+    return var
+  if not type(var) in (list, tuple):
+    var = list(var)
+  _checkAllowedTypes( obj, var )
+  return var
+
+def _arrayListNew( obj, values ):
+  """
+  Returns a copy of obj holding the values array as its elements.
+  """
+  from copy import copy
+  ret = copy( obj )
+  ret._buffer = values
+  ret._size = len(values)
+  return ret
+
+def _LimitedTypeArrayList____init__( self, *args ):
+  """
+    Default __init__ method
+  """
+  if args:
+    self.__iadd__(*args)
+
+def _LimitedTypeArrayList__append( self, var ):
+  """
+    Default append method
+  """
+  if not isinstance(var, self._acceptedTypes):
+    raise NotAllowedType( self, var, self._acceptedTypes)
+  size = self._size
+  if size == len(self._buffer):
+    _arrayListReserve( self, size + 1 )
+  self._buffer[size] = var
+  self._size = size + 1
+
+def _LimitedTypeArrayList__extend( self, var ):
+  """
+    Default extend method
+  """
+  values = _arrayListValues( self, var )
+  size = self._size
+  _arrayListReserve( self, size + len(values) )
+  self._buffer[size:size+len(values)] = values
+  self._size = size + len(values)
+
+def _LimitedTypeArrayList____iadd__( self, var, *args ):
+  """
+    Default __iadd__ method
+  """
+  if args:
+    _checkAllowedTypes( self, args )
+  if type(var) in (list, tuple) or isinstance( var, np.ndarray ) \
+      or isinstance( type(var), LimitedTypeArrayList ):
+    self.extend( var )
+  else:
+    self.append( var )
+  if args:
+    self.extend( args )
+  return self
+
+def _LimitedTypeArrayList____add__( self, var ):
+  """
+    Default __add__ method, returns a copy of this list with var added to it.
+  """
+  ret = _arrayListNew( self, self.array.copy() )
+  ret += var
+  return ret
+
+def _LimitedTypeArrayList____len__( self ):
+  return self._size
+
+def _LimitedTypeArrayList____getitem__( self, k ):
+  """
+    Default __getitem__ method. Slices are returned as lists of the same class.
+  """
+  view = self._buffer[:self._size]
+  if isinstance(k, slice):
+    return _arrayListNew( self, view[k].copy() )
+  return view.item(k) if self._pythonScalars else view[k]
+
+def _LimitedTypeArrayList____setitem__( self, k, var ):
+  """
+    Default __setitem__ method
+  """
+  view = self._buffer[:self._size]
+  if isinstance(k, slice):
+    var = _arrayListValues( self, var )
+    if len(xrange(*k.indices(self._size))) != len(var):
+      raise ValueError("Cannot change the size of %s using slice assignment." % self.__class__.__name__)
+  elif not isinstance(var, self._acceptedTypes):
+    raise NotAllowedType( self, var, self._acceptedTypes)
+  view[k] = var
+
+def _LimitedTypeArrayList__pop( self, index = -1 ):
+  """
+    Default pop method
+  """
+  var = self[index]
+  if index < 0:
+    index += self._size
+  view = self._buffer[:self._size]
+  view[index:-1] = view[index+1:]
+  self._size -= 1
+  return var
+
+def _LimitedTypeArrayList____delitem__( self, k ):
+  """
+    Default __delitem__ method
+  """
+  keep = np.ones( self._size, dtype = bool )
+  keep[k] = False
+  view = self._buffer[:self._size]
+  size = int( keep.sum() )
+  view[:size] = view[keep]
+  self._size = size
+
+def _LimitedTypeArrayList__insert( self, index, var ):
+  """
+    Default insert method
+  """
+  if not isinstance(var, self._acceptedTypes):
+    raise NotAllowedType( self, var, self._acceptedTypes)
+  size = self._size
+  if index < 0:
+    index = max( index + size, 0 )
+  index = min( index, size )
+  _arrayListReserve( self, size + 1 )
+  self._buffer[index+1:size+1] = self._buffer[index:size]
+  self._buffer[index] = var
+  self._size = size + 1
+
+def _LimitedTypeArrayList__index( self, var, start = 0, stop = None ):
+  """
+    Default index method
+  """
+  start, stop, _ = slice( start, stop ).indices( self._size )
+  matches = np.flatnonzero( self._buffer[start:stop] == var )
+  if not len(matches):
+    raise ValueError("%r is not in %s" % (var, self.__class__.__name__))
+  return start + int( matches[0] )
+
+def _LimitedTypeArrayList__count( self, var ):
+  """
+    Default count method
+  """
+  return int( np.count_nonzero( self._buffer[:self._size] == var ) )
+
+def _LimitedTypeArrayList__remove( self, var ):
+  """
+    Default remove method
+  """
+  del self[self.index( var )]
+
+def _LimitedTypeArrayList__reverse( self ):
+  """
+    Default reverse method
+  """
+  view = self._buffer[:self._size]
+  view[:] = view[::-1].copy()
+
+def _LimitedTypeArrayList__sort( self, cmp = None, key = None, reverse = False ):
+  """
+    Default sort method. The buffer is sorted by numpy unless cmp or key are
+    specified.
+  """
+  view = self._buffer[:self._size]
+  if cmp is not None or key is not None:
+    view[:] = sorted( self.tolist(), cmp, key, reverse )
+    return
+  view.sort()
+  if reverse:
+    view[:] = view[::-1].copy()
+
+def _LimitedTypeArrayList____iter__( self ):
+  view = self._buffer[:self._size]
+  return iter( view.tolist() if self._pythonScalars else view )
+
+def _LimitedTypeArrayList____call__( self ):
+  """
+    Default __call__ method.
+    Yield holden objects.
+  """
+  for obj in self:
+    yield obj
+
+def _LimitedTypeArrayList____contains__( self, var ):
+  return var in self._buffer[:self._size]
+
+def _LimitedTypeArrayList____eq__( self, other ):
+  if isinstance( type(other), LimitedTypeArrayList ):
+    other = other.tolist()
+  return self.tolist() == other
+
+def _LimitedTypeArrayList____ne__( self, other ):
+  return not self == other
+
+def _LimitedTypeArrayList____array__( self, dtype = None ):
+  view = self._buffer[:self._size]
+  return view if dtype is None else view.astype( dtype, copy = False )
+
+def _LimitedTypeArrayList__tolist( self ):
+  """
+    Returns the elements on a list of python scalars.
+  """
+  return self._buffer[:self._size].tolist()
+
+def _LimitedTypeArrayList____repr__( self ):
+  return '%s(%r)' % ( self.__class__.__name__, self.tolist() )
+
+class LimitedTypeArrayListRDS( LimitedTypeListRDS ):
+  """
+  This is the default streamer class for the limited type array lists. The
+  items are streamed as a numpy array.
+  """
+
+  transientAttrs = {'_buffer', '_size'}
+
+  def __init__(self, transientAttrs = set(), toPublicAttrs = set(), **kw):
+    transientAttrs = set(transientAttrs) | LimitedTypeArrayListRDS.transientAttrs
+    LimitedTypeListRDS.__init__(self, transientAttrs, toPublicAttrs, **kw)
+
+  def __call__(self, obj):
+    "Return a raw dict object from itself"
+    setattr(obj, 'items', obj.array.copy())
+    raw = RawDictStreamer.__call__( self, obj )
+    obj.__dict__.pop('items')
+    return raw
+
+  def treatDict(self, obj, raw):
+    return RawDictStreamer.treatDict( self, obj, raw )
+
+class LoggerLimitedTypeArrayListRDS( LoggerRawDictStreamer, LimitedTypeArrayListRDS ):
+  def __init__(self, transientAttrs = set(), toPublicAttrs = set(), **kw):
+    transientAttrs = set(transientAttrs) | LoggerRawDictStreamer.transientAttrs
+    LimitedTypeArrayListRDS.__init__(self, transientAttrs, toPublicAttrs, **kw)
+
+class LimitedTypeArrayListRDC( LimitedTypeListRDC ):
+  """
+  This is the default converter class for the limited type array lists.
+  """
+
+  def treatObj( self, obj, d ):
+    """
+    Overload this method to treat the python object
+    """
+    obj.extend( d['items'] )
+    return obj
+
+  def rawChildren( self, d ):
+    return RawDictCnv.rawChildren( self, d )
+
+class LimitedTypeStreamableArrayList( RawDictStreamable, LimitedTypeArrayList ):
+  """
+  LimitedTypeArrayList with RawDictStreamable capability.
+  """
+
+  def __init__(cls, name, bases, dct):
+    RawDictStreamable.__init__(cls,name, bases, dct)
+    LimitedTypeArrayList.__init__(cls,name, bases, dct)
+
+  def __new__(cls, name, bases, dct):
+    from RingerCore.Logger import Logger
+    if Logger in bases:
+      checkAttrOrSetDefault( "_streamerObj", dct, bases, LoggerLimitedTypeArrayListRDS )
+    else:
+      checkAttrOrSetDefault( "_streamerObj", dct, bases, LimitedTypeArrayListRDS )
+    checkAttrOrSetDefault( "_cnvObj", dct, bases, LimitedTypeArrayListRDC )
+    _prepareRawDictStreamable( bases, dct )
+    _prepareLimitedTypeArrayList( bases, dct )
+    return type.__new__(cls, name, bases, dct)
 
 def inspect_list_attrs(var, nDepth, wantedType = None, tree_types = (list,tuple), dim = None, name = "", level = None, deepcopy = False, allowSpan = True ):
   """
@@ -312,3 +773,43 @@ def inspect_list_attrs(var, nDepth, wantedType = None, tree_types = (list,tuple)
     from copy import deepcopy
     var = deepcopy( var )
   return var
+
+# The methods added to the LimitedTypeList and LimitedTypeArrayList classes.
+# They are searched only once, after all of them were declared.
+import sys
+_limitedTypeListMethods = _searchMethods( sys.modules[__name__], _lMethodSearch )
+_limitedTypeArrayListMethods = _searchMethods( sys.modules[__name__], _lArrayMethodSearch )
+
+def _prepareLimitedTypeList( bases, dct, hasBaseInit = None ):
+  """
+  Add the LimitedTypeList methods to the class dict and returns its bases,
+  which include list.
+  """
+  if not any( [ issubclass(base, list) for base in bases ] ):
+    bases = (list,) + bases
+  if hasBaseInit is None:
+    hasBaseInit = any([hasattr(base,'__init__') for base in bases if base.__name__ not in
+                                                                    ("list", "object", "Logger", "LoggerStreamable",)])
+  for fcnName, fcn in _limitedTypeListMethods.iteritems():
+    if not fcnName in dct:
+      if hasBaseInit and fcnName == '__init__' and not dct.get('_useLimitedTypeList__init__', False):
+        continue
+      dct[fcnName] = fcn
+  return bases
+
+def _prepareLimitedTypeArrayList( bases, dct ):
+  """
+  Add the LimitedTypeArrayList methods to the class dict.
+  """
+  hasBaseInit = any([base.__init__ is not object.__init__ for base in bases if base.__name__ not in
+                                                                             ("Logger", "LoggerStreamable",)])
+  for fcnName, fcn in _limitedTypeArrayListMethods.iteritems():
+    if not fcnName in dct:
+      if hasBaseInit and fcnName == '__init__' and not dct.get('_useLimitedTypeList__init__', False):
+        continue
+      dct[fcnName] = fcn
+  if not 'array' in dct:
+    dct['array'] = property( _arrayListView, doc = "The list elements as a numpy array." )
+  # Lists are mutable and compared by value, thus they are not hashable
+  if not '__hash__' in dct:
+    dct['__hash__'] = None
@@ -3,9 +3,12 @@ __all__ = ['LoopingBounds', 'MatlabLoopingBounds', 'PythonLoopingBounds',
            'transformToSeqBounds', 'LoopingBoundsCollection',
            'MatlabLoopingBoundsCollection', 'PythonLoopingBoundsCollection',
            'SetDepth','ltraverse', 'straverse','traverse', 'window',
-           'firstItemDepth']
+           'firstItemDepth', 'to_ragged_array', 'from_ragged_array',
+           'ragged_reduceat', 'ragged_mean']
 
 import numpy as np
+from itertools import imap, chain
+from operator import itemgetter
 from RingerCore.Logger import Logger
 
 class SetDepth(Exception):
@@ -81,79 +84,96 @@ def traverse(o, tree_types=(list, tuple),
   In [5]: for obj in traverse(a,(list, tuple),5): print obj
   <NO OUTPUT>
 
+  The tree is walked using an explicit stack, so that deep trees do not
+  cost one generator frame per level for each yielded value.
   """
-  if isinstance(o, tree_types):
-    level += 1
-    # FIXME Still need to test max_depth
-    if level > max_depth:
-      if simple_ret:
-        yield o
-      elif length_ret:
-        yield level
-      else:
-        yield o, parent_idx, parent, 0, level
-      return
-    skipped = False
-    isDict = isinstance(o, dict)
-    if isDict:
-      loopingObj = o.iteritems()
-    else:
-      loopingObj = enumerate(o)
-    for idx, value in loopingObj:
-      try:
-        for subvalue, subidx, subparent, subdepth_dist, sublevel in traverse(value 
-                                                                            , tree_types     = tree_types
-                                                                            , max_depth_dist = max_depth_dist
-                                                                            , max_depth      = max_depth
-                                                                            , level          = level
-                                                                            , parent_idx     = idx
-                                                                            , parent         = o ):
-          if subdepth_dist == max_depth_dist:
-            if skipped:
-              subdepth_dist += 1
-              break
-            else:
-              if simple_ret:
-                yield subvalue
-              elif length_ret:
-                yield sublevel
-              else:
-                yield subvalue, subidx, subparent, subdepth_dist, sublevel 
-          else:
-            subdepth_dist += 1
-            break
-        else: 
-          continue
-      except SetDepth, e:
-        if simple_ret:
-          yield o
-        elif length_ret:
-          yield level
-        else:
-          yield o, parent_idx, parent, e.depth, level
+  if isinstance(max_depth, np.integer):
+    # Avoid comparing against a numpy integer for each element
+    max_depth = int(max_depth)
+  if simple_ret and max_depth_dist == 0 and isinstance(o, tree_types) and level < max_depth:
+    return __traverse_leaves(o, tree_types, max_depth - level)
+  ret = __traverse(o, tree_types, max_depth_dist, max_depth, level, parent_idx, parent)
+  if simple_ret:
+    ret = imap(itemgetter(0), ret)
+  elif length_ret:
+    ret = imap(itemgetter(4), ret)
+  return ret
+
+def __tree_items(o):
+  """
+  Returns an iterator over the (index, value) pairs of tree o.
+  """
+  return o.iteritems() if isinstance(o, dict) else enumerate(o)
+
+def __traverse_leaves(o, tree_types, max_levels):
+  """
+  Yields the values traversed when the maximum depth distance is 0, which are
+  all values which are not trees and the trees beyond max_levels.
+  """
+  stack = [ iter( o.itervalues() if isinstance(o, dict) else o ) ]
+  while stack:
+    for value in stack[-1]:
+      if isinstance(value, tree_types) and len(stack) < max_levels:
+        stack.append( iter( value.itervalues() if isinstance(value, dict) else value ) )
         break
-      if subdepth_dist == max_depth_dist:
-        if skipped:
-          subdepth_dist += 1
-          break
-        else:
-          if simple_ret:
-            yield o
-          elif length_ret:
-            yield level
-          else:
-            yield o, parent_idx, parent, subdepth_dist, level
+      yield value
+    else:
+      stack.pop()
+
+def __traverse(o, tree_types, max_depth_dist, max_depth, level, parent_idx, parent):
+  """
+  Yields the traverse (value, index, parent, depth distance, level) tuples.
+
+  Each tree on the stack yields the tuples from its children which are at
+  max_depth_dist from the leaves. When one of its children is nearer, the tree
+  stops looping: it either yields itself when it is at max_depth_dist, keeps
+  looping when it can still reach max_depth_dist, or raises SetDepth, so that
+  its parent yields itself instead.
+  """
+  if not isinstance(o, tree_types):
+    yield o, parent_idx, parent, 0, level
+    return
+  level += 1
+  if level > max_depth:
+    yield o, parent_idx, parent, 0, level
+    return
+  # Each frame holds (tree, level, index on parent, parent, items iterator)
+  stack = [ (o, level, parent_idx, parent, __tree_items(o)) ]
+  while stack:
+    tree, level, _, _, items = stack[-1]
+    for idx, value in items:
+      if isinstance(value, tree_types):
+        if level < max_depth:
+          stack.append( (value, level + 1, idx, tree, __tree_items(value)) )
           break
+        ret = (value, idx, tree, 0, level + 1)
       else:
-        if level > (max_depth_dist - subdepth_dist):
-          raise SetDepth(subdepth_dist+1)
-  else:
-    if simple_ret:
-      yield o
-    elif length_ret:
-      yield level
+        ret = (value, idx, tree, 0, level)
+      if max_depth_dist == 0:
+        yield ret
+        continue
+      depthDist = 1
+      while True:
+        frame = stack.pop()
+        tree, level, treeIdx, treeParent, _ = frame
+        if depthDist == max_depth_dist:
+          yield tree, treeIdx, treeParent, depthDist, level
+          break
+        if level <= ( max_depth_dist - depthDist ):
+          # Keep looping over this tree
+          stack.append( frame )
+          break
+        if not stack:
+          raise SetDepth(depthDist+1)
+        tree, level, treeIdx, treeParent, _ = stack.pop()
+        ret = (tree, treeIdx, treeParent, depthDist + 1, level)
+        if not stack or ret[3] == max_depth_dist:
+          yield ret
+          break
+        depthDist = ret[3] + 1
+      break
     else:
-      yield o, parent_idx, parent, 0, level
+      stack.pop()
 
 class LoopingBounds ( Logger ):
   """
@@ -557,4 +577,94 @@ def window( container, w ):
     maxIdx += w
   return jobWindowList
 
+def to_ragged_array( nested, tree_types = (list, tuple), dtype = None ):
+  """
+  Flattens the nested lists into a contiguous numpy array, keeping their
+  structure on the offsets of each nesting level, as on the CSR format.
+  The lists may have different lengths, but all leaves must be at the same
+  depth.
+    -> nested: the nested lists;
+    -> tree_types: the types considered as lists;
+    -> dtype: the flattened array dtype.
+  Returns the flattened values and the offsets list. The nodes at depth d are
+  described by offsets[d]: node i holds the items offsets[d][i] up to
+  offsets[d][i+1] of depth d+1, or of the values for the last depth. The
+  first offsets describe the nested list itself.
+
+  In [0]: to_ragged_array( [[[1.,2.],[3.]],[[],[4.,5.,6.]]] )
+  (array([1., 2., 3., 4., 5., 6.]), [array([0, 2]), array([0, 2, 4]), array([0, 2, 3, 3, 6])])
+  """
+  if not isinstance( nested, tree_types ):
+    raise ValueError("Cannot flatten a %s which is not one of the tree types." % type(nested).__name__)
+  offsets = []
+  nodes = [ nested ]
+  # Nodes are flattened level by level, so that empty lists are kept on the
+  # offsets.
+  while True:
+    offsets.append( np.concatenate( ( [0], np.cumsum( map( len, nodes ) ) ) ).astype( np.int64 ) )
+    children = list( chain.from_iterable( nodes ) )
+    isTree = [ isinstance( child, tree_types ) for child in children ]
+    if not any( isTree ):
+      break
+    if not all( isTree ):
+      raise ValueError("All leaves must be at the same depth to flatten the nested lists.")
+    nodes = children
+  return np.array( children, dtype = dtype ), offsets
+
+def from_ragged_array( values, offsets ):
+  """
+  Rebuilds the nested lists flattened by to_ragged_array. Numpy values are
+  retrieved as python scalars.
+  """
+  nodes = values.tolist() if isinstance( values, np.ndarray ) else list( values )
+  for levelOffsets in reversed( offsets ):
+    levelOffsets = list( levelOffsets )
+    nodes = [ nodes[start:end] for start, end in zip( levelOffsets[:-1], levelOffsets[1:] ) ]
+  return nodes[0]
 
+def __ragged_leaf_offsets( offsets, depth ):
+  """
+  Returns the offsets on the values of the nodes at depth.
+  """
+  depth = range( len( offsets ) )[depth]
+  leafOffsets = offsets[depth]
+  for levelOffsets in offsets[depth+1:]:
+    leafOffsets = levelOffsets[leafOffsets]
+  return leafOffsets
+
+def ragged_reduceat( ufunc, values, offsets, depth = -1, empty = None ):
+  """
+  Reduces the values held by each node of the flattened nested lists, e.g.:
+  ragged_reduceat( np.maximum, *to_ragged_array( nested ) ) returns the
+  maximum of each of the innermost lists.
+    -> ufunc: the numpy ufunc used to reduce, e.g. np.add or np.maximum;
+    -> values, offsets: as returned by to_ragged_array;
+    -> depth: the depth of the reduced nodes, 0 reduces all values and -1 the
+      innermost lists;
+    -> empty: the value for empty nodes, the ufunc identity by default.
+  """
+  leafOffsets = __ragged_leaf_offsets( offsets, depth )
+  starts = leafOffsets[:-1]
+  nonEmpty = leafOffsets[1:] > starts
+  if nonEmpty.all():
+    return ufunc.reduceat( values, starts )
+  if empty is None:
+    empty = ufunc.identity
+    if empty is None:
+      raise ValueError("%s has no identity, set the value of the empty nodes." % ufunc.__name__)
+  # Empty nodes are skipped as reduceat would return the next value for them
+  reduced = ufunc.reduceat( values, starts[nonEmpty] )
+  ret = np.empty( len(starts), dtype = np.result_type( reduced, empty ) )
+  ret[nonEmpty] = reduced
+  ret[~nonEmpty] = empty
+  return ret
+
+def ragged_mean( values, offsets, depth = -1 ):
+  """
+  Returns the mean of the values held by each node of the flattened nested
+  lists. Empty nodes have nan mean. See ragged_reduceat.
+  """
+  sums = ragged_reduceat( np.add, values, offsets, depth, empty = 0 )
+  counts = np.diff( __ragged_leaf_offsets( offsets, depth ) )
+  with np.errstate( invalid = 'ignore', divide = 'ignore' ):
+    return np.true_divide( sums, counts )
@@ -1,11 +1,16 @@
 __all__ = ['RawDictStreamable', 'RawDictStreamer', 'RawDictCnv', 'mangle_attr',
            'LoggerStreamable', 'LoggerRawDictStreamer', 'checkAttrOrSetDefault',
-           'isRawDictFormat', 'retrieveRawDict']
+           'isRawDictFormat', 'retrieveRawDict', 'materialize']
 
-from RingerCore.Logger import Logger
+from RingerCore.Logger import Logger, LoggingLevel
+from RingerCore.util import str_to_class
+import threading
 
 mLogger = Logger.getModuleLogger( __name__ )
 
+# The materializer currently building objects on each thread
+_materializeState = threading.local()
+
 def mangle_attr(source, attr):
   """
   Simulate python private attritubutes mangling. Taken from:
@@ -20,6 +25,33 @@ def mangle_attr(source, attr):
   # mangle attr
   return "_%s%s" % (source.__name__.lstrip("_"), attr)
 
+def _isStreamable( val, cl ):
+  """
+  Returns whether val, which is either an instance or the class cl, is a
+  RawDictStreamable object.
+  """
+  try:
+    streamable = issubclass( val.__metaclass__, RawDictStreamable)
+  except (AttributeError, TypeError):
+    streamable = False
+  return streamable or isinstance( cl, RawDictStreamable)
+
+class _StreamerPlan( object ):
+  """
+  Streaming information computed once for each class streamed by a
+  RawDictStreamer.
+  """
+
+  def __init__(self, streamer, cls):
+    self.transientAttrs = frozenset(streamer.transientAttrs)
+    self.toPublicAttrs = frozenset(streamer.toPublicAttrs)
+    self.publicAttrs = [ (mangle_attr(cls, searchKey), searchKey.lstrip('_'))
+                         for searchKey in self.toPublicAttrs ]
+    self.className = cls.__name__
+    self.module = cls.__module__
+    # The classes of the attribute values and whether they are streamable
+    self.streamableTypes = {}
+
 class RawDictStreamer( Logger ):
   """
   This is the default streamer class, responsible of converting python classes
@@ -41,41 +73,67 @@ class RawDictStreamer( Logger ):
   def __call__(self, obj):
     "Return a raw dict object from itself"
     self.preCall(obj)
-    raw = { key : val for key, val in obj.__dict__.iteritems() if key not in self.transientAttrs }
-    for searchKey in self.toPublicAttrs:
-      publicKey = searchKey.lstrip('_')
-      searchKey = mangle_attr(obj, searchKey)
+    plan = self._plan( obj.__class__ )
+    transientAttrs = plan.transientAttrs
+    raw = { key : val for key, val in obj.__dict__.iteritems() if key not in transientAttrs }
+    verbose = self._logger.isEnabledFor( LoggingLevel.VERBOSE )
+    for searchKey, publicKey in plan.publicAttrs:
       if searchKey in raw:
-        self._verbose( "Transforming '%s' attribute to public attribute '%s'.",
-                              searchKey,
-                              publicKey )
+        if verbose:
+          self._verbose( "Transforming '%s' attribute to public attribute '%s'.",
+                                searchKey,
+                                publicKey )
         raw[publicKey] = raw.pop(searchKey)
       else:
         self._fatal("Cannot transform to public key attribute '%s'", searchKey, KeyError)
+    streamableTypes = plan.streamableTypes
     for key, val in raw.iteritems():
+      cl = val.__class__ if not hasattr(val, "__bases__") else val
       try:
-        streamable = issubclass( val.__metaclass__, RawDictStreamable)
-      except AttributeError:
-        streamable = False
-      if not hasattr(val, "__bases__"):
-        cl = val.__class__
-      else:
-        cl = val
-      if streamable or isinstance( cl, RawDictStreamable):
-        self._verbose( "Found a streamable instance of type '%s' on attribute named '%s'."
-                     , cl.__name__
-                     , key )
+        streamable = streamableTypes[cl]
+      except KeyError:
+        streamable = streamableTypes[cl] = _isStreamable( val, cl )
+      except TypeError:
+        # Unhashable class
+        streamable = _isStreamable( val, cl )
+      if streamable:
+        if verbose:
+          self._verbose( "Found a streamable instance of type '%s' on attribute named '%s'."
+                       , cl.__name__
+                       , key )
         raw[key] = val.toRawObj()
-    from copy import copy
-    raw = copy( raw )
-    raw['class'] = obj.__class__.__name__
-    raw['__module'] = obj.__class__.__module__
+    raw['class'] = plan.className
+    raw['__module'] = plan.module
     try:
       raw['__version'] = raw.pop('_version')
     except KeyError:
       raw['__version'] = obj.__class__._version
     return self.treatDict( obj, raw )
 
+  def _plan(self, cls):
+    """
+    Returns the streaming plan for class cls, which is computed once for each
+    class streamed by this streamer. It is recomputed if the transient or
+    public attributes are changed.
+    """
+    plans = self.__dict__.get('_plans')
+    if plans is None:
+      from weakref import WeakKeyDictionary
+      plans = self.__dict__['_plans'] = WeakKeyDictionary()
+    plan = plans.get(cls)
+    if plan is None or plan.transientAttrs != self.transientAttrs \
+        or plan.toPublicAttrs != self.toPublicAttrs:
+      plan = plans[cls] = _StreamerPlan( self, cls )
+    return plan
+
+  def __getstate__(self):
+    """
+      Makes logger and streaming plans invisible for pickle
+    """
+    odict = Logger.__getstate__(self)
+    odict.pop('_plans', None)
+    return odict
+
   def treatDict(self, obj, raw):
     """
     Method dedicated to modifications on raw dictionary
@@ -123,6 +181,23 @@ class RawDictCnv( Logger ):
   def _searchAttr(self, val):
     return [protectedAttr.lstrip('_') for protectedAttr in self.toProtectedAttrs].index(val)
 
+  def _compiled(self):
+    """
+    Returns the combined ignoreAttrs regular expression match method and the
+    dict mapping the raw dict keys to the protected attribute names. They are
+    computed once, and again only if ignoreAttrs or toProtectedAttrs change.
+    """
+    key = ( list(self.ignoreAttrs), frozenset(self.toProtectedAttrs) )
+    compiled = self.__dict__.get('_compiledCnv')
+    if compiled is None or compiled[0] != key:
+      ignoreRE = re.compile( '|'.join( '(?:%s)' % getattr( ignoreAttr, 'pattern', ignoreAttr )
+                                       for ignoreAttr in self.ignoreAttrs ) )
+      attrMap = {}
+      for protectedAttr in self.toProtectedAttrs:
+        attrMap.setdefault( protectedAttr.lstrip('_'), mangle_attr( self.__class__, protectedAttr ) )
+      compiled = self.__dict__['_compiledCnv'] = ( key, ignoreRE.match, attrMap )
+    return compiled[1], compiled[2]
+
   def preCall(self, obj, d):
     "Overload this method if you want to make special treatments before streaming the object."
     return obj, d
@@ -136,29 +211,35 @@ class RawDictCnv( Logger ):
       obj._readVersion = d['__version']
     except KeyError:
       obj._readVersion = 0
-    for k in d:
-      if any([bool(ignoreAttr.match(k)) for ignoreAttr in self.ignoreAttrs]): 
-        continue
-      try:
-        # We only load val if it is not in ignoredAttr
-        val = d[k]
-        nK = mangle_attr( self.__class__, 
-                          list(self.toProtectedAttrs)[self._searchAttr(k)] 
-                        )
-        if not self.ignoreRawChildren:
-          obj.__dict__[nK] = retrieveRawDict( val, logger = self._logger )
-        else:
-          obj.__dict__[nK] = val
+    ignore, attrMap = self._compiled()
+    objDict = obj.__dict__
+    materializer = getattr( _materializeState, 'materializer', None )
+    lazy = materializer is not None and materializer.lazy
+    for k, val in d.iteritems():
+      if ignore(k):
         continue
-      except ValueError:
-        pass
-      if not self.ignoreRawChildren:
-        obj.__dict__[k] = retrieveRawDict( val, logger = self._logger )
+      # Public attributes are renamed to their protected names
+      nK = attrMap.get(k, k)
+      if self.ignoreRawChildren:
+        objDict[nK] = val
+      elif lazy and isRawDictFormat( val ) and not id(val) in materializer.memo:
+        objDict[nK] = materializer.placeholder( val, objDict, nK, self._logger )
       else:
-        obj.__dict__[k] = val
+        objDict[nK] = retrieveRawDict( val, logger = self._logger )
     ret = self.treatObj( obj, d )
     return ret
 
+  def rawChildren( self, d ):
+    """
+    Returns the raw dictionaries on d which are converted to python objects by
+    this converter. Overload this method if the converter retrieves other raw
+    dictionaries, so that materialize builds them beforehand.
+    """
+    if self.ignoreRawChildren:
+      return []
+    ignore, _ = self._compiled()
+    return [ val for k, val in d.iteritems() if not ignore(k) and isRawDictFormat( val ) ]
+
   def treatObj( self, obj, d ):
     """
     Overload this method to treat the python object
@@ -170,6 +251,7 @@ class RawDictCnv( Logger ):
       Makes logger invisible for pickle
     """
     odict = Logger.__getstate__(self)
+    odict.pop('_compiledCnv', None)
     #def getStr(i):
     #  if isinstance(i, re
     if 'ignoreAttrs' in odict:
@@ -207,15 +289,181 @@ def retrieveRawDict( val, logger = mLogger ):
   Transform rawDict to an instance from its respective python class
   """
   if isRawDictFormat( val ):
+    materializer = getattr( _materializeState, 'materializer', None )
+    if materializer is not None:
+      try:
+        return materializer.memo[id(val)][1]
+      except KeyError:
+        pass
+    raw = val
     try:
-      from RingerCore.util import str_to_class
-      logger.verbose( "Converting rawDict to an instance of type '%s'." % val['class'] )
+      logger.verbose( "Converting rawDict to an instance of type '%s'.", val['class'] )
       cls = str_to_class( val['__module'], val['class'] )
       val = cls.fromRawObj( val )
     except KeyError, e:
       logger.error("Couldn't convert rawDict to an instance of type '%s'!\n Reason: %s", val['class'], e)
+    if materializer is not None:
+      # Keep the raw dictionary alive so that its id is not reused
+      materializer.memo[id(raw)] = (raw, val)
   return val
 
+class _Materializer( object ):
+  """
+  Holds the objects built by materialize, indexed by the id of their raw
+  dictionaries, so that shared raw dictionaries are built only once.
+  """
+
+  def __init__(self, lazy = False):
+    self.lazy = lazy
+    self.memo = {}
+    self.placeholders = {}
+
+  def retrieve(self, raw, logger = mLogger):
+    "Retrieve raw using the objects already built by this materializer."
+    previous = getattr( _materializeState, 'materializer', None )
+    _materializeState.materializer = self
+    try:
+      return retrieveRawDict( raw, logger = logger )
+    finally:
+      _materializeState.materializer = previous
+
+  def placeholder(self, raw, parentDict, key, logger = mLogger):
+    "Returns the placeholder of raw, which is shared by all its parents."
+    try:
+      placeholder = self.placeholders[id(raw)]
+    except KeyError:
+      placeholder = self.placeholders[id(raw)] = _LazyRawObj( self, raw, logger )
+    placeholder._parents.append( (parentDict, key) )
+    return placeholder
+
+  def build(self, roots, logger = mLogger):
+    """
+    Build the raw dictionaries on roots and their raw children, children
+    first, without recursing through the converters.
+    """
+    memo = self.memo
+    expanding = set()
+    stack = [ (raw, False) for raw in reversed(roots) if isRawDictFormat( raw ) ]
+    while stack:
+      raw, expanded = stack.pop()
+      key = id(raw)
+      if key in memo:
+        continue
+      if expanded:
+        expanding.discard( key )
+        self.retrieve( raw, logger )
+        continue
+      expanding.add( key )
+      stack.append( (raw, True) )
+      try:
+        children = str_to_class( raw['__module'], raw['class'] )._cnvObj.rawChildren( raw )
+      except (KeyError, ImportError, AttributeError):
+        # Leave the errors to be reported when building the object
+        continue
+      # Children still being expanded belong to reference cycles, which are
+      # left to the converters.
+      stack.extend( (child, False) for child in reversed(children)
+                    if not id(child) in memo and not id(child) in expanding )
+
+_notMaterialized = object()
+
+class _LazyRawObj( object ):
+  """
+  Placeholder for a raw child which is materialized when first accessed. Once
+  materialized, the placeholder replaces itself on its parents by the object.
+  """
+
+  __slots__ = ('_materializer', '_raw', '_parents', '_logger', '_obj')
+
+  def __init__(self, materializer, raw, logger = mLogger):
+    object.__setattr__( self, '_materializer', materializer     )
+    object.__setattr__( self, '_raw',          raw              )
+    object.__setattr__( self, '_parents',      []               )
+    object.__setattr__( self, '_logger',       logger           )
+    object.__setattr__( self, '_obj',          _notMaterialized )
+
+  def _materialize(self):
+    obj = self._obj
+    if obj is _notMaterialized:
+      obj = self._materializer.retrieve( self._raw, self._logger )
+      for parentDict, key in self._parents:
+        if parentDict.get( key ) is self:
+          parentDict[key] = obj
+      object.__setattr__( self, '_obj', obj )
+      object.__setattr__( self, '_parents', [] )
+    return obj
+
+  # Make isinstance checks work on the materialized object
+  __class__ = property( lambda self: self._materialize().__class__ )
+
+  def __getattr__(self, attr):
+    return getattr( self._materialize(), attr )
+
+  def __setattr__(self, attr, val):
+    setattr( self._materialize(), attr, val )
+
+  def __delattr__(self, attr):
+    delattr( self._materialize(), attr )
+
+  def __reduce_ex__(self, protocol):
+    return self._materialize().__reduce_ex__( protocol )
+
+  def __repr__(self):
+    return repr( self._materialize() )
+
+  def __str__(self):
+    return str( self._materialize() )
+
+  def __nonzero__(self):
+    return bool( self._materialize() )
+
+  def __len__(self):
+    return len( self._materialize() )
+
+  def __iter__(self):
+    return iter( self._materialize() )
+
+  def __contains__(self, item):
+    return item in self._materialize()
+
+  def __getitem__(self, key):
+    return self._materialize()[key]
+
+  def __setitem__(self, key, val):
+    self._materialize()[key] = val
+
+  def __eq__(self, other):
+    return self._materialize() == other
+
+  def __ne__(self, other):
+    return self._materialize() != other
+
+  def __hash__(self):
+    return hash( self._materialize() )
+
+  def __call__(self, *args, **kw):
+    return self._materialize()( *args, **kw )
+
+def materialize( rawTree, lazy = False, logger = mLogger ):
+  """
+  Transform rawTree to an instance from its respective python class. Contrary
+  to retrieveRawDict, the raw children are built iteratively, so that deep
+  trees do not hit the recursion limit, and raw dictionaries shared within the
+  tree are built only once.
+
+  Since the children are built before their parents, converters which change
+  their children raw dictionaries (on preCall or treatObj) receive the built
+  objects instead. Use retrieveRawDict for such trees.
+    -> rawTree: the raw dictionary. Other values are returned unchanged.
+    -> lazy: the raw children held by the object attributes are only built
+      when first accessed. Until then, the attributes hold placeholders which
+      forward to the built object.
+  """
+  materializer = _Materializer( lazy )
+  if not lazy:
+    materializer.build( [rawTree], logger )
+  return materializer.retrieve( rawTree, logger )
+
 import re
 _lMethodSearch=re.compile("_RawDictStreamable__(\S+)")
 
@@ -225,10 +473,12 @@ def checkAttrOrSetDefault( key, dct, bases, defaultType ):
   Otherwise set it to defaultType.
   """
   if not key in dct:
-    dct[key] = defaultType()
     for base in bases:
       if key in base.__dict__:
         dct[key] = getattr(base,key)
+    # Only create the default instance when no base declares it
+    if not key in dct:
+      dct[key] = defaultType()
   else:
     if not isinstance(dct[key], defaultType):
       if type(dct[key]) is type:
@@ -251,23 +501,7 @@ class RawDictStreamable( type ):
   """
 
   def __new__(cls, name, bases, dct):
-    import inspect
-    import sys
-    for localFcnName, fcn in inspect.getmembers( sys.modules[__name__], \
-        inspect.isfunction):
-      m = _lMethodSearch.match(localFcnName)
-      if m:
-        fcnName = m.group(1)
-        if not fcnName in dct:
-          dct[fcnName] = fcn
-    ## Take care to _streamerObj and _cnvObj be in the right specification
-    checkAttrOrSetDefault( '_streamerObj', dct, bases, RawDictStreamer )
-    checkAttrOrSetDefault( '_cnvObj',      dct, bases, RawDictCnv      )
-    if not '_version' in dct:
-      dct['_version'] = 1
-    if not type(dct['_version']) is int:
-      raise ValueError("_version must be declared as an int.")
-    dct['_readVersion'] = 0
+    _prepareRawDictStreamable( bases, dct )
     return type.__new__(cls, name, bases, dct)
 
   def fromRawObj(cls, obj, workOnCopy = False, **kw):
@@ -281,13 +515,16 @@ class RawDictStreamable( type ):
     if workOnCopy:
       obj = deepcopy( obj )
     self = cls()
-    # NOTE: We always replace the cnvObj by the one available in the class to
-    # ensure that it will behave as desired in case it is used to read an 
-    # object twice, though this will probably very rarely (if ever) be used.
-    self._cnvObj = deepcopy(cls._cnvObj)
+    # NOTE: We always use the cnvObj available in the class to ensure that it
+    # will behave as desired in case it is used to read an object twice. The
+    # class converter is shared by all instances and is not changed while
+    # converting, so it is only copied when kw changes its attributes.
     if kw:
+      self._cnvObj = deepcopy(cls._cnvObj)
       for key, val in kw.iteritems():
         setattr( self._cnvObj, key, val)
+    else:
+      self.__dict__.pop('_cnvObj', None)
     self = self.buildFromDict( obj )
     # Delete instance specific converter
     if kw: del self._cnvObj
@@ -302,6 +539,40 @@ def _RawDictStreamable__buildFromDict(self, d):
   self = self._cnvObj( self, d )
   return self
 
+def _searchMethods( module, methodSearch ):
+  """
+  Returns a dict with the functions on module whose names match methodSearch,
+  indexed by the method name captured by its first group.
+  """
+  import inspect
+  methods = {}
+  for localFcnName, fcn in inspect.getmembers( module, inspect.isfunction ):
+    m = methodSearch.match(localFcnName)
+    if m:
+      methods[m.group(1)] = fcn
+  return methods
+
+# The methods added to the RawDictStreamable classes. They are searched only
+# once, so all of them must be declared above.
+import sys
+_rawDictStreamableMethods = _searchMethods( sys.modules[__name__], _lMethodSearch )
+
+def _prepareRawDictStreamable( bases, dct ):
+  """
+  Add the RawDictStreamable methods and attributes to the class dict.
+  """
+  for fcnName, fcn in _rawDictStreamableMethods.iteritems():
+    if not fcnName in dct:
+      dct[fcnName] = fcn
+  ## Take care to _streamerObj and _cnvObj be in the right specification
+  checkAttrOrSetDefault( '_streamerObj', dct, bases, RawDictStreamer )
+  checkAttrOrSetDefault( '_cnvObj',      dct, bases, RawDictCnv      )
+  if not '_version' in dct:
+    dct['_version'] = 1
+  if not type(dct['_version']) is int:
+    raise ValueError("_version must be declared as an int.")
+  dct['_readVersion'] = 0
+
 class LoggerRawDictStreamer(RawDictStreamer):
   """
   Deal logger object streaming. All streaming Logger objects should have
@@ -6,7 +6,7 @@ __all__ = ['Include', 'include', 'str_to_class', 'Roc', 'calcSP',
            'select', 'timed', 'getFilters', 'start_after', 'appendToOutput',
            'apply_sort', 'scale10', 'measureLoopTime', 'keyboard', 
            'is_tool', 'secureExtractNpItem', 'emptyArgumentsPrintHelp', 
-           'os_environ_get', 'measureCallTime', 'grouper',]
+           'os_environ_get', 'measureCallTime', 'grouper', 'lru_cache',]
 
 import re, os, __main__
 import sys
@@ -53,19 +53,34 @@ def sourceEnvFile():
   except IOError:
     raise RuntimeError("Cannot find new_env_file.sh, did you forget to set environment or compile the package?")
   
+# Process-wide cache of the classes retrieved by str_to_class
+_strToClassCache = {}
+
 def str_to_class(module_name, class_name):
+  """
+  Returns class class_name from module module_name.
+
+  The resolved classes are cached. A cached class is only used while its
+  module is still the one on sys.modules and it still holds the class, so that
+  reloaded modules and redefined classes are retrieved again.
+  """
+  try:
+    m, c = _strToClassCache[(module_name, class_name)]
+    if sys.modules.get(module_name) is m and vars(m).get(class_name) is c:
+      return c
+  except KeyError:
+    pass
   try:
     import importlib
   except ImportError:
     # load the module, will raise ImportError if module cannot be loaded
     m = __import__(module_name, globals(), locals(), class_name)
-    # get the class, will raise AttributeError if class cannot be found
-    c = getattr(m, class_name)
-    return c
-  # load the module, will raise ImportError if module cannot be loaded
-  m = importlib.import_module(module_name)
+  else:
+    # load the module, will raise ImportError if module cannot be loaded
+    m = importlib.import_module(module_name)
   # get the class, will raise AttributeError if class cannot be found
   c = getattr(m, class_name)
+  _strToClassCache[(module_name, class_name)] = (m, c)
   return c
 
 
@@ -132,7 +147,7 @@ def printArgs(args, fcn = None):
 
 def progressbar(it, count ,prefix="", size=60, step=1, disp=True, logger = None, level = None,
                 no_bl = RCM_GRID_ENV or sys.stdout.isatty(), 
-                measureTime = True):
+                measureTime = True, suffix = None):
   """
     Display progressbar.
 
@@ -146,7 +161,9 @@ def progressbar(it, count ,prefix="", size=60, step=1, disp=True, logger = None,
     -> logger: use this logger object instead o sys.stdout;
     -> level: the output level used on logger;
     -> no_bl: whether to show messages without breaking lines;
-    -> measureTime: display time measurement when completing progressbar task.
+    -> measureTime: display time measurement when completing progressbar task;
+    -> suffix: a callable returning a string to be displayed after the
+    iteration count, evaluated every time the progressbar is updated.
   """
   from RingerCore.Logger import LoggingLevel
   from logging import StreamHandler
@@ -156,19 +173,20 @@ def progressbar(it, count ,prefix="", size=60, step=1, disp=True, logger = None,
   def _show(_i):
     x = int(size*_i/count) if count else 0
     if _i % (step if step else 1): return
+    extra = suffix() if suffix is not None else ''
     if logger:
       if logger.isEnabledFor(level):
         fn, lno, func = logger.findCaller() 
         record = logger.makeRecord(logger.name, level, fn, lno, 
-                                   "%s|%s%s| %i/%i\r",
-                                   (prefix, "█"*x, "-"*(size-x), _i, count,), 
+                                   "%s|%s%s| %i/%i%s\r",
+                                   (prefix, "█"*x, "-"*(size-x), _i, count, extra,), 
                                    None, 
                                    func=func)
         record.nl = False
         # emit message
         logger.handle(record)
     else:
-      sys.stdout.write("%s|%s%s| %i/%i\r" % (prefix, "█"*x, "-"*(size-x), _i, count))
+      sys.stdout.write("%s|%s%s| %i/%i%s\r" % (prefix, "█"*x, "-"*(size-x), _i, count, extra))
       sys.stdout.flush()
   # end of (_show)
   # prepare for looping:
@@ -629,3 +647,61 @@ def grouper(iterable, n, fillvalue=None):
   args = [iter(iterable)] * n
   from itertools import izip_longest
   return izip_longest(fillvalue=fillvalue, *args)
+
+def lru_cache(maxsize = 128):
+  """
+  Memoize the decorated function results for the last maxsize (positional,
+  hashable) arguments used. Uses functools.lru_cache when available,
+  otherwise the least recently used results are approximated by the second
+  chance (clock) algorithm. As in functools, a maxsize of 0 disables the
+  cache and None does not limit its size.
+  """
+  try:
+    from functools import lru_cache as _lru_cache
+    return _lru_cache(maxsize = maxsize)
+  except ImportError:
+    pass
+  from collections import deque
+  from threading import Lock
+  def decorator(f):
+    if maxsize is not None and maxsize <= 0:
+      def func(*args):
+        return f(*args)
+      func.cache_clear = lambda: None
+      func.__name__ = f.__name__
+      func.__doc__ = f.__doc__
+      return func
+    cache = {}
+    queue = deque()
+    referenced = set()
+    lock = Lock()
+    def func(*args):
+      try:
+        ret = cache[args]
+        referenced.add(args)
+        return ret
+      except KeyError:
+        pass
+      ret = f(*args)
+      with lock:
+        if args not in cache:
+          while maxsize is not None and len(cache) >= maxsize:
+            key = queue.popleft()
+            if key in referenced:
+              referenced.discard(key)
+              queue.append(key)
+            else:
+              del cache[key]
+          queue.append(args)
+        cache[args] = ret
+      return ret
+    def cache_clear():
+      with lock:
+        cache.clear()
+        queue.clear()
+        referenced.clear()
+    func.cache_clear = cache_clear
+    func.__name__ = f.__name__
+    func.__doc__ = f.__doc__
+    return func
+  return decorator
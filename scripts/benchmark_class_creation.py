@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+from RingerCore import ( ArgumentParser, Logger, LoggingLevel, RawDictStreamable
+                       , LimitedTypeList, LimitedTypeStreamableList, LimitedTypeListRDS
+                       , LimitedTypeListRDC, LoggerLimitedTypeListRDS, RawDictStreamer
+                       , RawDictCnv, checkAttrOrSetDefault, LoggerStreamable )
+import inspect, sys
+# The modules are shadowed by their homonymous classes on RingerCore
+rawDictStreamableModule = sys.modules['RingerCore.RawDictStreamable']
+limitedTypeListModule = sys.modules['RingerCore.LimitedTypeList']
+from time import time
+
+parser = ArgumentParser( description = 'Measure the cost of creating classes using the RingerCore metaclasses.' )
+parser.add_argument('--n-classes', action='store', type=int, default=1000,
+            help = "Number of classes created for each metaclass")
+parser.add_argument('--repeat', action='store', type=int, default=3,
+            help = "Number of times each measurement is repeated")
+args = parser.parse_args()
+
+mainLogger = Logger.getModuleLogger( __name__, LoggingLevel.INFO )
+
+class LegacyRawDictStreamable( RawDictStreamable ):
+  """
+  Copy of the RawDictStreamable class creation searching the module functions
+  for every class.
+  """
+  def __new__(cls, name, bases, dct):
+    for localFcnName, fcn in inspect.getmembers( rawDictStreamableModule, inspect.isfunction ):
+      m = rawDictStreamableModule._lMethodSearch.match(localFcnName)
+      if m:
+        fcnName = m.group(1)
+        if not fcnName in dct:
+          dct[fcnName] = fcn
+    checkAttrOrSetDefault( '_streamerObj', dct, bases, RawDictStreamer )
+    checkAttrOrSetDefault( '_cnvObj',      dct, bases, RawDictCnv      )
+    if not '_version' in dct:
+      dct['_version'] = 1
+    if not type(dct['_version']) is int:
+      raise ValueError("_version must be declared as an int.")
+    dct['_readVersion'] = 0
+    return type.__new__(cls, name, bases, dct)
+
+class LegacyLimitedTypeList( LimitedTypeList ):
+  """
+  Copy of the LimitedTypeList class creation searching the module functions
+  for every class.
+  """
+  def __new__(cls, name, bases, dct):
+    if not any( [ issubclass(base, list) for base in bases ] ):
+      bases = (list,) + bases
+    hasBaseInit = any([hasattr(base,'__init__') for base in bases if base.__name__ not in
+                                                                    ("list", "object", "Logger", "LoggerStreamable",)])
+    for localFcnName, fcn in inspect.getmembers( limitedTypeListModule, inspect.isfunction ):
+      m = limitedTypeListModule._lMethodSearch.match(localFcnName)
+      if m:
+        fcnName = m.group(1)
+        if not fcnName in dct:
+          if hasBaseInit and fcnName == '__init__' and not dct.get('_useLimitedTypeList__init__', False):
+            continue
+          dct[fcnName] = fcn
+    return type.__new__(cls, name, bases, dct)
+
+class LegacyLimitedTypeStreamableList( LegacyRawDictStreamable, LegacyLimitedTypeList ):
+  """
+  Copy of the LimitedTypeStreamableList class creation, which created an
+  intermediate class.
+  """
+  def __init__(cls, name, bases, dct):
+    LegacyRawDictStreamable.__init__(cls,name, bases, dct)
+    LegacyLimitedTypeList.__init__(cls,name, bases, dct)
+
+  def __new__(cls, name, bases, dct):
+    from RingerCore.Logger import Logger
+    if Logger in bases:
+      checkAttrOrSetDefault( "_streamerObj", dct, bases, LoggerLimitedTypeListRDS )
+    else:
+      checkAttrOrSetDefault( "_streamerObj", dct, bases, LimitedTypeListRDS )
+    checkAttrOrSetDefault( "_cnvObj", dct, bases, LimitedTypeListRDC )
+    t1 = LegacyRawDictStreamable.__new__(cls, name, bases, dct)
+    name = t1.__name__
+    bases = tuple(t1.mro())
+    dct = t1.__dict__.copy()
+    return LegacyLimitedTypeList.__new__(cls, name, bases, dct)
+
+class Item( object ):
+  pass
+
+def createClasses( metaclass, bases ):
+  dct = {} if not issubclass( metaclass, LimitedTypeList ) else {'_acceptedTypes' : (Item,)}
+  return [ metaclass( 'Generated%d' % idx, bases, dict( dct ) ) for idx in xrange(args.n_classes) ]
+
+def measure( fcn ):
+  best = float('inf')
+  for _ in range(args.repeat):
+    start = time()
+    ret = fcn()
+    best = min( best, time() - start )
+  return best, ret
+
+mainLogger.info( "Creating %d classes:", args.n_classes )
+mainLogger.info( "%-25s | %-16s | %10s | %11s | %7s", 'metaclass', 'bases', 'legacy (s)', 'current (s)', 'speedup' )
+for legacy, current, bases in [ (LegacyRawDictStreamable,         RawDictStreamable,         (object,))
+                              , (LegacyRawDictStreamable,         RawDictStreamable,         (LoggerStreamable,))
+                              , (LegacyLimitedTypeList,           LimitedTypeList,           (object,))
+                              , (LegacyLimitedTypeStreamableList, LimitedTypeStreamableList, (object,)) ]:
+  tLegacy, legacyClasses = measure( lambda: createClasses( legacy, bases ) )
+  t, classes = measure( lambda: createClasses( current, bases ) )
+  legacyMethods = [ name for name in dir( legacyClasses[-1] ) if not name.startswith('_Generated') ]
+  if sorted( legacyMethods ) != sorted( dir( classes[-1] ) ):
+    mainLogger.fatal( "%s classes have different attributes than the legacy ones!", current.__name__ )
+  mainLogger.info( "%-25s | %-16s | %10.3f | %11.3f | %6.1fx", current.__name__
+                 , ', '.join( base.__name__ for base in bases ), tLegacy, t, tLegacy / t )
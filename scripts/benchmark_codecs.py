@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+from RingerCore import ( ArgumentParser, Logger, LoggingLevel, save, load
+                       , getCodec )
+import numpy as np
+import tempfile, os
+from shutil import rmtree
+from time import time
+
+parser = ArgumentParser( description = 'Compare size and speed of the compression codecs available on FileIO.save.' )
+parser.add_argument('--n-objects', action='store', type=int, default=500,
+            help = "Number of tuned discriminator raw dicts on the payload")
+parser.add_argument('--codecs', action='store', nargs='+',
+            default = ['gzip:9', 'gzip:6', 'gzip:1', 'bz2:9', 'xz:6', 'xz:1', 'zstd:3', 'zstd:10', 'lz4:0'],
+            help = "Codecs to benchmark, written as name:level")
+parser.add_argument('--repeat', action='store', type=int, default=3,
+            help = "Number of times each measurement is repeated")
+args = parser.parse_args()
+
+mainLogger = Logger.getModuleLogger( __name__, LoggingLevel.INFO )
+
+def rawDict( cls, **kw ):
+  kw.update( { 'class' : cls, '__module' : 'TuningTools.TuningJob', '__version' : 1 } )
+  return kw
+
+def createPayload():
+  # Mimics the tuning results: discriminators, ROC curves and performance
+  # values written with limited precision.
+  objs = []
+  for idx in range(args.n_objects):
+    nPts = 1000
+    pd = np.sort( np.round( np.random.rand( nPts ), 4 ) )
+    pf = np.sort( np.round( pd * np.random.rand( nPts ), 4 ) )
+    objs.append( rawDict( 'TunedDiscrInfo'
+                        , sort = idx % 10, init = idx // 10
+                        , discriminator = rawDict( 'Discriminator'
+                                                 , nodes = [100, 10, 1]
+                                                 , weights = np.random.randn( 1010 ).astype( 'float32' )
+                                                 , bias = np.random.randn( 11 ).astype( 'float32' ) )
+                        , roc = rawDict( 'Roc', pd = pd, pf = pf
+                                       , sp = np.sqrt( np.sqrt( pd * ( 1 - pf ) ) * ( pd + ( 1 - pf ) ) / 2 )
+                                       , thres = np.linspace( -1, 1, nPts ) )
+                        , epochs = int( np.random.randint( 10, 1000 ) )
+                        , perf = [ round( v, 6 ) for v in np.random.rand( 50 ) ] ) )
+  return rawDict( 'TunedDiscrArchieve', tunedDiscr = objs, neuronBounds = [5, 20], sortBounds = [0, 10] )
+
+def measure( fcn ):
+  best = float('inf')
+  for _ in range(args.repeat):
+    start = time()
+    ret = fcn()
+    best = min( best, time() - start )
+  return best, ret
+
+payload = createPayload()
+tmpFolder = tempfile.mkdtemp()
+try:
+  rawSize = os.path.getsize( save( payload, os.path.join( tmpFolder, 'raw' ), compress = False ) )
+  rows = []
+  for codecStr in args.codecs:
+    name, level = codecStr.split(':')
+    try:
+      getCodec( name ).open( os.path.join( tmpFolder, 'probe' ), 'wb', int(level) ).close()
+    except ImportError, e:
+      mainLogger.warning( "Skipping codec %s: %s", name, e )
+      continue
+    filename = os.path.join( tmpFolder, 'payload_%s_%s' % (name, level) )
+    tSave, filename = measure( lambda: save( payload, filename, compress = name, level = int(level) ) )
+    tLoad, _ = measure( lambda: load( filename ) )
+    size = os.path.getsize( filename )
+    rows.append( (name, level, size / 1024.**2, float(rawSize) / size, tSave, tLoad) )
+  mainLogger.info( "Uncompressed pickle size: %.2f MB", rawSize / 1024.**2 )
+  mainLogger.info( "%-6s | %5s | %9s | %6s | %8s | %8s", 'codec', 'level', 'size (MB)', 'ratio', 'save (s)', 'load (s)' )
+  for row in rows:
+    mainLogger.info( "%-6s | %5s | %9.2f | %6.2f | %8.3f | %8.3f", *row )
+finally:
+  rmtree( tmpFolder )
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+from RingerCore import ( ArgumentParser, Logger, LoggingLevel, expandFolders
+                       , expandPath, progressbar, traverse )
+import tempfile, os
+from shutil import rmtree
+from time import time
+
+parser = ArgumentParser( description = 'Compare the expandFolders implementation with its previous glob based version.' )
+parser.add_argument('--n-folders', action='store', type=int, default=100,
+            help = "Number of folders on the tree root")
+parser.add_argument('--n-subfolders', action='store', type=int, default=10,
+            help = "Number of subfolders within each folder")
+parser.add_argument('--n-files', action='store', type=int, default=100,
+            help = "Number of files within each subfolder")
+parser.add_argument('--filter', action='store', default='*.pic.gz',
+            help = "Filter used to expand the tree")
+parser.add_argument('--workers', action='store', type=int, nargs='+', default=[4, 16],
+            help = "Number of threads used to walk the tree in parallel")
+parser.add_argument('--repeat', action='store', type=int, default=3,
+            help = "Number of times each measurement is repeated")
+args = parser.parse_args()
+
+mainLogger = Logger.getModuleLogger( __name__, LoggingLevel.INFO )
+
+def legacyExpandFolders( pathList, filters = None, logger = None, level = None):
+  """
+  Copy of the glob based expandFolders implementation
+  """
+  if not isinstance( pathList, (list,tuple,) ):
+    pathList = [pathList]
+  from glob import glob
+  if filters is None:
+    filters = ['*']
+  if not( type( filters ) in (list,tuple,) ):
+    filters = [ filters ]
+  retList = [[] for idx in range(len(filters))]
+  pathList = list(traverse([glob(path) if '*' in path else path for path in traverse(pathList,simple_ret=True)],simple_ret=True))
+  for path in progressbar( pathList, len(pathList), 'Expanding folders: ', 60, 50,
+                           True if logger is not None else False, logger = logger,
+                           level = level):
+    path = expandPath( path )
+    if not os.path.exists( path ):
+      raise ValueError("Cannot reach path '%s'" % path )
+    if os.path.isdir(path):
+      for idx, filt in enumerate(filters):
+        cList = filter(lambda x: not(os.path.isdir(x)), [ f for f in glob( os.path.join(path,filt) ) ])
+        if cList:
+          retList[idx].extend(cList)
+      folders = [ os.path.join(path,f) for f in os.listdir( path ) if os.path.isdir( os.path.join(path,f) ) ]
+      if folders:
+        recList = legacyExpandFolders( folders, filters )
+        if len(filters) is 1:
+          recList = [recList]
+        for l in recList:
+          retList[idx].extend(l)
+    else:
+      for idx, filt in enumerate(filters):
+        if path in glob( os.path.join( os.path.dirname( path ) , filt ) ):
+          retList[idx].append( path )
+  if len(filters) is 1:
+    retList = retList[0]
+  return retList
+
+def createTree( root ):
+  for fIdx in range(args.n_folders):
+    for sIdx in range(args.n_subfolders):
+      folder = os.path.join( root, 'job_%04d' % fIdx, 'sort_%02d' % sIdx )
+      os.makedirs( folder )
+      for idx in range(args.n_files):
+        ext = 'pic.gz' if idx % 4 else 'root'
+        open( os.path.join( folder, 'tuned_%04d.%s' % (idx, ext) ), 'w' ).close()
+
+def measure( fcn ):
+  best = float('inf')
+  for _ in range(args.repeat):
+    start = time()
+    ret = fcn()
+    best = min( best, time() - start )
+  return best, ret
+
+tmpFolder = tempfile.mkdtemp()
+try:
+  createTree( tmpFolder )
+  nFiles = args.n_folders * args.n_subfolders * args.n_files
+  mainLogger.info( "Benchmarking a tree with %d files using filter '%s'.", nFiles, args.filter )
+  tLegacy, legacy = measure( lambda: legacyExpandFolders( tmpFolder, args.filter ) )
+  mainLogger.info( "%-12s | %8.3fs | %d files", 'legacy', tLegacy, len(legacy) )
+  for label, kw in [ ('serial', {}), ('generator', {'useGenerator' : True}) ] + \
+                   [ ('workers=%d' % w, {'workers' : w}) for w in args.workers ]:
+    t, ret = measure( lambda: list( expandFolders( tmpFolder, args.filter, **kw ) ) )
+    if sorted( ret ) != sorted( legacy ):
+      mainLogger.fatal( "%s returned different files than the legacy implementation!", label )
+    mainLogger.info( "%-12s | %8.3fs | %d files | speedup: %.1fx", label, t, len(ret), tLegacy / t )
+  # Expanding a list of files: previously, the parent folder was globbed for
+  # each one of them
+  fileList = legacy[:args.n_files * args.n_subfolders]
+  tLegacy, legacy = measure( lambda: legacyExpandFolders( fileList, args.filter ) )
+  t, ret = measure( lambda: expandFolders( fileList, args.filter ) )
+  if ret != legacy:
+    mainLogger.fatal( "Expanding a file list returned different files than the legacy implementation!" )
+  mainLogger.info( "Expanding a list of %d files: legacy %.3fs, current %.3fs (speedup: %.1fx)",
+                   len(fileList), tLegacy, t, tLegacy / t )
+finally:
+  rmtree( tmpFolder )
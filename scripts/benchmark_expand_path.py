@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+from RingerCore import ( ArgumentParser, Logger, LoggingLevel, expandPath
+                       , expandPath_many )
+import tempfile, os
+from shutil import rmtree
+from time import time
+
+parser = ArgumentParser( description = 'Measure expandPath with and without its cache on typical file lists.' )
+parser.add_argument('--n-files', action='store', type=int, default=10000,
+            help = "Number of paths on the file list")
+parser.add_argument('--n-links', action='store', type=int, default=100,
+            help = "Number of paths which are symbolic links")
+parser.add_argument('--passes', action='store', type=int, default=10,
+            help = "Number of times the file list is expanded")
+args = parser.parse_args()
+
+mainLogger = Logger.getModuleLogger( __name__, LoggingLevel.INFO )
+
+def measure( fcn ):
+  start = time()
+  for _ in range(args.passes):
+    ret = fcn()
+  return time() - start, ret
+
+tmpFolder = tempfile.mkdtemp()
+cwd = os.getcwd()
+try:
+  # The file list mixes paths using environment variables, user symbols,
+  # relative paths and symbolic links.
+  os.environ['BENCHMARK_EXPAND_PATH'] = tmpFolder
+  os.chdir( tmpFolder )
+  paths = []
+  for idx in range(args.n_files):
+    name = 'tuned_%05d.pic.gz' % idx
+    open( name, 'w' ).close()
+    if idx < args.n_links:
+      os.symlink( os.path.join( tmpFolder, name ), 'link_' + name )
+      paths.append( 'link_' + name )
+    elif idx % 3 == 0:
+      paths.append( os.path.join( '$BENCHMARK_EXPAND_PATH', name ) )
+    elif idx % 3 == 1:
+      paths.append( name )
+    else:
+      paths.append( os.path.join( tmpFolder, name ) )
+  tRef, ref = measure( lambda: [ expandPath( path, useCache = False ) for path in paths ] )
+  mainLogger.info( "Expanding %d paths %d times:", args.n_files, args.passes )
+  mainLogger.info( "%-16s | %8.3fs", 'no cache', tRef )
+  for label, fcn in ( ('cache',           lambda: [ expandPath( path, useCache = True ) for path in paths ] )
+                    , ('expandPath_many', lambda: expandPath_many( paths, useCache = True ) ) ):
+    t, ret = measure( fcn )
+    if ret != ref:
+      mainLogger.fatal( "%s returned different paths!", label )
+    mainLogger.info( "%-16s | %8.3fs | speedup: %.1fx", label, t, tRef / t )
+finally:
+  os.chdir( cwd )
+  rmtree( tmpFolder )
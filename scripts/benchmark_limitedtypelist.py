@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+from RingerCore import ( ArgumentParser, Logger, LoggingLevel, LimitedTypeList
+                       , NotAllowedType )
+from time import time
+
+parser = ArgumentParser( description = 'Measure the LimitedTypeList type checking when filling lists.' )
+parser.add_argument('--n-elements', action='store', type=int, default=1000000,
+            help = "Number of elements added to the lists")
+parser.add_argument('--repeat', action='store', type=int, default=3,
+            help = "Number of times each measurement is repeated")
+args = parser.parse_args()
+
+mainLogger = Logger.getModuleLogger( __name__, LoggingLevel.INFO )
+
+class Item( object ):
+  pass
+
+class DerivedItem( Item ):
+  pass
+
+class ItemList( object ):
+  __metaclass__ = LimitedTypeList
+  _acceptedTypes = (Item,)
+
+def legacyIadd( self, var ):
+  """
+  Copy of the element by element __iadd__ type checking
+  """
+  for value in var:
+    if not isinstance( value, self._acceptedTypes ):
+      raise NotAllowedType( self, value, self._acceptedTypes )
+  list.__iadd__(self, var)
+  return self
+
+def measure( fcn ):
+  best = float('inf')
+  for _ in range(args.repeat):
+    start = time()
+    ret = fcn()
+    best = min( best, time() - start )
+  return best, ret
+
+def fillAppend( items ):
+  l = ItemList()
+  for item in items:
+    l.append( item )
+  return l
+
+def fillExtend( items ):
+  l = ItemList()
+  l.extend( items )
+  return l
+
+def fillIadd( items ):
+  l = ItemList()
+  l += items
+  return l
+
+def fillLegacyIadd( items ):
+  return legacyIadd( ItemList(), items )
+
+items = [ Item() if idx % 2 else DerivedItem() for idx in xrange(args.n_elements) ]
+tRef, _ = measure( lambda: list( items ) )
+mainLogger.info( "Adding %d elements to a LimitedTypeList (plain list copy: %.3fs):", args.n_elements, tRef )
+tLegacy, _ = measure( lambda: fillLegacyIadd( items ) )
+mainLogger.info( "%-22s | %8.3fs", 'legacy __iadd__', tLegacy )
+for label, fcn in [ ('append', fillAppend)
+                  , ('extend', fillExtend)
+                  , ('__iadd__', fillIadd)
+                  , ('__add__', lambda items: ItemList() + items)
+                  , ('extend (generator)', lambda items: fillExtend( item for item in items ) ) ]:
+  t, l = measure( lambda: fcn( items ) )
+  if len(l) != args.n_elements:
+    mainLogger.fatal( "%s did not add all elements!", label )
+  mainLogger.info( "%-22s | %8.3fs | speedup w.r.t. legacy __iadd__: %.1fx", label, t, tLegacy / t )
+try:
+  fillExtend( items + [None] )
+  mainLogger.fatal( "extend accepted a not allowed type!" )
+except NotAllowedType:
+  pass
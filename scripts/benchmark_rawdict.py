@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+from RingerCore import ( ArgumentParser, Logger, LoggingLevel, RawDictStreamable
+                       , RawDictStreamer, RawDictCnv, mangle_attr, retrieveRawDict )
+from time import time
+
+parser = ArgumentParser( description = 'Measure the RawDictCnv conversion time as the number of keys grows.' )
+parser.add_argument('--n-keys', action='store', type=int, nargs='+', default=[10, 100, 1000],
+            help = "Number of attributes on the converted objects")
+parser.add_argument('--n-objects', action='store', type=int, default=200,
+            help = "Number of converted objects")
+args = parser.parse_args()
+
+mainLogger = Logger.getModuleLogger( __name__, LoggingLevel.INFO )
+
+class LegacyRawDictCnv( RawDictCnv ):
+  """
+  Copy of the RawDictCnv conversion before compiling the attribute mapping
+  """
+  def __call__(self, obj, d):
+    obj, d = self.preCall(obj, d)
+    try:
+      obj._readVersion = d['__version']
+    except KeyError:
+      obj._readVersion = 0
+    for k in d:
+      if any([bool(ignoreAttr.match(k)) for ignoreAttr in self.ignoreAttrs]):
+        continue
+      try:
+        val = d[k]
+        nK = mangle_attr( self.__class__,
+                          list(self.toProtectedAttrs)[self._searchAttr(k)]
+                        )
+        if not self.ignoreRawChildren:
+          obj.__dict__[nK] = retrieveRawDict( val, logger = self._logger )
+        else:
+          obj.__dict__[nK] = val
+        continue
+      except ValueError:
+        pass
+      if not self.ignoreRawChildren:
+        obj.__dict__[k] = retrieveRawDict( val, logger = self._logger )
+      else:
+        obj.__dict__[k] = val
+    ret = self.treatObj( obj, d )
+    return ret
+
+def createClass( nKeys, cnvType ):
+  # Half of the attributes are protected, and streamed as public attributes
+  protected = [ '_attr%d' % idx for idx in range(0, nKeys, 2) ]
+  def __init__(self):
+    for idx in range(nKeys):
+      setattr(self, ( '_attr%d' if idx % 2 == 0 else 'attr%d' ) % idx, idx)
+  return RawDictStreamable( 'Bench%d%s' % (nKeys, cnvType.__name__), (object,),
+                            { '__init__' : __init__
+                            , '_streamerObj' : RawDictStreamer( toPublicAttrs = protected )
+                            , '_cnvObj' : cnvType( toProtectedAttrs = protected
+                                                 , ignoreAttrs = ['ignored_.*'] ) } )
+
+mainLogger.info( "%6s | %15s | %16s | %8s", 'keys', 'legacy (us/key)', 'current (us/key)', 'speedup' )
+for nKeys in args.n_keys:
+  times = []
+  for cnvType in (LegacyRawDictCnv, RawDictCnv):
+    cls = createClass( nKeys, cnvType )
+    raws = [ cls().toRawObj() for _ in range(args.n_objects) ]
+    start = time()
+    objs = [ cls._cnvObj( cls.__new__(cls), raw ) for raw in raws ]
+    times.append( ( time() - start ) / ( args.n_objects * nKeys ) * 1e6 )
+    objs[-1].__dict__.pop('_readVersion')
+    assert objs[-1].__dict__ == cls().__dict__
+  mainLogger.info( "%6d | %15.3f | %16.3f | %7.1fx", nKeys, times[0], times[1], times[0] / times[1] )
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+from RingerCore import ( ArgumentParser, Logger, LoggingLevel, load
+                       , cat_files_py, WriteMethod )
+import numpy as np
+import cPickle, tarfile, tempfile, os, StringIO
+from shutil import rmtree
+from time import time
+
+parser = ArgumentParser( description = 'Compare the tarball loading strategies available on FileIO.load.' )
+parser.add_argument('--n-members', action='store', type=int, default=200,
+            help = "Number of members on the generated tarball")
+parser.add_argument('--n-chunks', action='store', type=int, default=4,
+            help = "Number of tarballs merged into the benchmark file")
+parser.add_argument('--array-size', action='store', type=int, default=10000,
+            help = "Number of floats stored on each member")
+parser.add_argument('--repeat', action='store', type=int, default=3,
+            help = "Number of times each measurement is repeated")
+args = parser.parse_args()
+
+mainLogger = Logger.getModuleLogger( __name__, LoggingLevel.INFO )
+
+def createTarball( path, members ):
+  with tarfile.open( path, 'w:gz' ) as tar:
+    for name in members:
+      data = cPickle.dumps( { 'name' : name
+                            , 'data' : np.random.rand( args.array_size ) }, -1 )
+      info = tarfile.TarInfo( name )
+      info.size = len(data)
+      tar.addfile( info, StringIO.StringIO( data ) )
+
+def measure( fcn ):
+  best = float('inf')
+  for _ in range(args.repeat):
+    start = time()
+    fcn()
+    best = min( best, time() - start )
+  return best
+
+tmpFolder = tempfile.mkdtemp()
+try:
+  names = [ 'member_%d.pic' % i for i in range(args.n_members) ]
+  chunks = []
+  for cIdx, cNames in enumerate(np.array_split( names, args.n_chunks )):
+    chunk = os.path.join( tmpFolder, 'chunk_%d.tgz' % cIdx )
+    createTarball( chunk, cNames )
+    chunks.append( chunk )
+  merged = os.path.join( tmpFolder, 'merged.tgz' )
+  cat_files_py( chunks, merged, WriteMethod.ShUtil )
+  lastMember = names[-1]
+  mainLogger.info( "Benchmarking %d members (%d merged tarballs, %.1f MB).",
+                   args.n_members, args.n_chunks, os.path.getsize( merged ) / 1024.**2 )
+  for label, kw in ( ('subprocess', {'streamTar' : False})
+                   , ('stream',     {'streamTar' : True}) ):
+    tAll = measure( lambda: [o for o in load( merged, useGenerator = True, **kw )] )
+    tOne = measure( lambda: load( merged, tarMember = lastMember, **kw ) )
+    mainLogger.info( "%-10s | all members: %8.3fs | last member: %8.3fs", label, tAll, tOne )
+finally:
+  rmtree( tmpFolder )
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+from RingerCore import ( ArgumentParser, Logger, LoggingLevel, traverse, SetDepth )
+import numpy as np
+import sys
+from time import time
+
+parser = ArgumentParser( description = 'Compare traverse with its previous recursive implementation.' )
+parser.add_argument('--n-leaves', action='store', type=int, default=100000,
+            help = "Approximate number of leaves on each tree")
+parser.add_argument('--depths', action='store', type=int, nargs='+', default=[2, 8, 32, 128],
+            help = "Depths of the benchmarked trees")
+parser.add_argument('--repeat', action='store', type=int, default=3,
+            help = "Number of times each measurement is repeated")
+args = parser.parse_args()
+
+mainLogger = Logger.getModuleLogger( __name__, LoggingLevel.INFO )
+
+def legacyTraverse(o, tree_types=(list, tuple),
+    max_depth_dist=0, max_depth=np.iinfo(np.uint64).max,
+    level=0, parent_idx=0, parent=None,
+    simple_ret=False, length_ret=False):
+  """
+  Copy of the recursive traverse implementation
+  """
+  if isinstance(o, tree_types):
+    level += 1
+    if level > max_depth:
+      if simple_ret:
+        yield o
+      elif length_ret:
+        yield level
+      else:
+        yield o, parent_idx, parent, 0, level
+      return
+    isDict = isinstance(o, dict)
+    if isDict:
+      loopingObj = o.iteritems()
+    else:
+      loopingObj = enumerate(o)
+    for idx, value in loopingObj:
+      try:
+        for subvalue, subidx, subparent, subdepth_dist, sublevel in legacyTraverse(value
+                                                                                  , tree_types     = tree_types
+                                                                                  , max_depth_dist = max_depth_dist
+                                                                                  , max_depth      = max_depth
+                                                                                  , level          = level
+                                                                                  , parent_idx     = idx
+                                                                                  , parent         = o ):
+          if subdepth_dist == max_depth_dist:
+            if simple_ret:
+              yield subvalue
+            elif length_ret:
+              yield sublevel
+            else:
+              yield subvalue, subidx, subparent, subdepth_dist, sublevel
+          else:
+            subdepth_dist += 1
+            break
+        else:
+          continue
+      except SetDepth, e:
+        if simple_ret:
+          yield o
+        elif length_ret:
+          yield level
+        else:
+          yield o, parent_idx, parent, e.depth, level
+        break
+      if subdepth_dist == max_depth_dist:
+        if simple_ret:
+          yield o
+        elif length_ret:
+          yield level
+        else:
+          yield o, parent_idx, parent, subdepth_dist, level
+        break
+      else:
+        if level > (max_depth_dist - subdepth_dist):
+          raise SetDepth(subdepth_dist+1)
+  else:
+    if simple_ret:
+      yield o
+    elif length_ret:
+      yield level
+    else:
+      yield o, parent_idx, parent, 0, level
+
+def createTree( depth, nLeaves ):
+  # Each level splits in the same number of branches, which makes deep trees
+  # narrow and shallow trees wide.
+  width = max( 2, int( round( nLeaves ** ( 1. / depth ) ) ) ) if depth < 16 else 2
+  def branch( level, leaves ):
+    if level == depth or leaves <= 1:
+      return list( range( leaves ) )
+    if depth >= 16:
+      # Deep trees are built as a long spine holding leaves on each level
+      return [ level, branch( level + 1, leaves - 1 ) ]
+    return [ branch( level + 1, leaves // width ) for _ in range( width ) ]
+  return branch( 0, nLeaves )
+
+def measure( fcn ):
+  best = float('inf')
+  for _ in range(args.repeat):
+    start = time()
+    ret = fcn()
+    best = min( best, time() - start )
+  return best, ret
+
+def identities( ret ):
+  # Compare the values and parents by identity
+  return [ ( id(r[0]), r[1], id(r[2]), r[3], r[4] ) if type(r) is tuple else id(r) for r in ret ]
+
+sys.setrecursionlimit( max( sys.getrecursionlimit(), 10 * max( args.depths ) ) )
+mainLogger.info( "%5s | %-22s | %10s | %11s | %7s", 'depth', 'mode', 'legacy (s)', 'current (s)', 'speedup' )
+for depth in args.depths:
+  tree = createTree( depth, args.n_leaves if depth < 16 else min( args.n_leaves, 100 * depth ) )
+  for label, kw in [ ('simple_ret',                {'simple_ret' : True})
+                   , ('tuples',                    {})
+                   , ('tuples max_depth_dist=1',   {'max_depth_dist' : 1})
+                   , ('simple_ret max_depth=2',    {'simple_ret' : True, 'max_depth' : 2}) ]:
+    tLegacy, legacy = measure( lambda: list( legacyTraverse( tree, **kw ) ) )
+    t, ret = measure( lambda: list( traverse( tree, **kw ) ) )
+    if identities( ret ) != identities( legacy ):
+      mainLogger.fatal( "traverse returned different values than the legacy implementation for %s!", label )
+    mainLogger.info( "%5d | %-22s | %10.3f | %11.3f | %6.1fx", depth, label, tLegacy, t, tLegacy / t )